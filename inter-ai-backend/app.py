@@ -1,23 +1,40 @@
 import os
+import sys
+
+# `python app.py --profile-startup` times every import and client below, then exits
+from startup import Lazy, startup_profile, warmup, lazy_status
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    startup_profile.start()
+
+import atexit
+import base64
 import json
 import re
 import uuid
+import time
+import threading
 import datetime as dt
-import numpy as np
 from typing import Dict, Any, List
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 import flask_cors
 import io
 from dotenv import load_dotenv
-from openai import AzureOpenAI, OpenAI
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
 
 
 load_dotenv()
 
+# PDF rendering runs in forked worker processes, started by start_background_services()
+from report_renderer import ReportRenderer
+report_renderer = ReportRenderer(
+    pool_size=int(os.getenv("REPORT_RENDER_WORKERS", "2")),
+    timeout=float(os.getenv("REPORT_RENDER_TIMEOUT", "120"))
+)
+
 # Proxy config moved to top
 
-from supabase import create_client, Client
+from auth import TokenVerifier
+from user_profiles import UserProfileCache
 
 # Initialize Supabase Client
 # Use anon key for auth verification (respects RLS)
@@ -25,13 +42,55 @@ url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")  # Anon key for auth operations
 service_key: str = os.environ.get("SUPABASE_SERVICE_KEY", key)  # Service key for admin ops (bypasses RLS)
 
-supabase: Client = create_client(url, key)  # For auth verification
-supabase_admin: Client = create_client(url, service_key) if service_key else supabase  # For database writes
+def create_supabase_client(api_key: str):
+    from supabase import create_client
+    return create_client(url, api_key)
+
+# Built on first use (or by the startup warmup) - most requests never need them
+supabase_client = Lazy("supabase", lambda: create_supabase_client(key))  # For auth verification
+supabase_admin = Lazy(
+    "supabase_admin",
+    lambda: create_supabase_client(service_key) if service_key else supabase_client.get()
+)  # For database writes
+
+# Access tokens are verified locally; supabase.auth.get_user is only the fallback
+AUTH_NETWORK_FALLBACK = os.getenv("AUTH_NETWORK_FALLBACK", "true").lower() == "true"
+token_verifier = TokenVerifier(
+    url,
+    jwt_secret=os.getenv("SUPABASE_JWT_SECRET"),
+    audience=os.getenv("AUTH_JWT_AUDIENCE", "authenticated"),
+    fallback=(lambda token: supabase_client.get().auth.get_user(token).user) if AUTH_NETWORK_FALLBACK else None,
+    cache_ttl=float(os.getenv("AUTH_CLAIMS_CACHE_TTL", "60")),
+    jwks_refresh=float(os.getenv("AUTH_JWKS_REFRESH", "600"))
+)
+
+def fetch_user_metadata(user_id: str):
+    """user_metadata from the Supabase admin API (requires service role key)."""
+    print(f"Fetching user details for {user_id}...")
+    user_res = supabase_admin.get().auth.admin.get_user_by_id(user_id)
+    return (user_res.user.user_metadata or {}) if user_res and user_res.user else None
+
+# Display names for reports; filled from token claims, admin API on a miss
+user_profiles = UserProfileCache(
+    fetch_user_metadata,
+    ttl=float(os.getenv("USER_PROFILE_CACHE_TTL", "3600")),
+    negative_ttl=float(os.getenv("USER_PROFILE_NEGATIVE_TTL", "300"))
+)
 
 # ---------------------------------------------------------
 # Custom Modules & Setup
 # ---------------------------------------------------------
-from cli_report import generate_report, llm_reply, analyze_full_report_data, detect_scenario_type, build_summary_prompt
+from cli_report import llm_reply, llm_stream, analyze_full_report_data, analyze_turn, detect_scenario_type, build_summary_prompt, report_template_version
+from stream_filter import TagStripper, sse_event
+from report_jobs import ReportJobQueue, TERMINAL_STATUSES
+from turn_analysis import TurnAnalyzer, digest_summaries
+from transcript_compaction import compact_history
+from question_retrieval import QuestionRetriever
+from session_cache import SessionCache
+from persistence_queue import WriteBehindQueue
+from session_locks import SessionLocks, SessionBusy
+from session_store import create_session_store, SessionConflict
+from report_cache import report_key, render_transcript, LocalReportCache
 
 # Database Models
 USE_DATABASE = True
@@ -40,7 +99,7 @@ USE_DATABASE = True
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
 try:
-    from models import init_db, get_session_by_id, create_session, update_session, save_report_metrics, get_user_history, db
+    from models import init_db, get_session_by_id, persist_session, get_user_history_page, StaleSessionError, db
     
     # Configure Database URI
     # Default to the service name 'db' from docker-compose
@@ -56,7 +115,8 @@ try:
         "pool_pre_ping": True,  # Check connection liveness before using
     }
     
-    init_db(app)
+    with startup_profile.timed("database"):
+        init_db(app)
     print(" [SUCCESS] Database connection established")
 except Exception as e:
     print(f" [WARNING] Database initialization failed: {e}")
@@ -72,6 +132,7 @@ flask_cors.CORS(app, resources={
             "https://*.vercel.app"            # All preview deployments
         ],
         "allow_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["X-Next-Cursor"],  # /api/history paging
         "supports_credentials": True
     }
 })
@@ -80,30 +141,76 @@ flask_cors.CORS(app, resources={
 # ---------------------------------------------------------
 # In-Memory Storage (Fallback if Database not available)
 # ---------------------------------------------------------
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# Bounded LRU/TTL cache - without a database, evicted sessions are gone
+SESSIONS = SessionCache(
+    max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "500")),
+    max_bytes=int(float(os.getenv("SESSION_CACHE_MAX_MB", "256")) * 1024 * 1024),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "3600"))
+)
+
+# Optional store shared by all workers (Redis or a local SQLite file); when
+# set, active sessions are read from it and Postgres is only checkpointed
+session_store = create_session_store(
+    os.getenv("SESSION_STORE_URL", ""),
+    ttl=float(os.getenv("SESSION_STORE_TTL", "86400"))
+)
+if session_store:
+    print(f" [INFO] Session state store: {session_store.stats()['backend']}")
+
+# Fields that only live in memory (not columns on PracticeHistory)
+SESSION_DEFAULTS = {
+    "framework": None,
+    "mode": "coaching",
+    "report_file": None,
+    "ai_character": "alex",
+}
+
+def merge_db_session(session_id: str, db_data: Dict[str, Any], cached: Dict[str, Any] = None) -> Dict[str, Any]:
+    """DB row as a session dict, keeping in-memory-only state from the cached copy."""
+    session_data = dict(cached or {})
+    session_data.update(db_data)
+    # Turn digests that landed after this worker's last write aren't in the row yet
+    session_data["turn_digests"] = {**((cached or {}).get("turn_digests") or {}), **(db_data.get("turn_digests") or {})}
+    session_data.setdefault("id", session_id)
+    session_data.setdefault("created_at", db_data.get("date"))
+    session_data.setdefault("meta", {"framework_counts": {}, "relevance_issues": 0})
+    for key, default in SESSION_DEFAULTS.items():
+        session_data.setdefault(key, default)
+    if session_data.get("report_data") is None:
+        session_data["report_data"] = {}
+    return session_data
 
 # ---------------------------------------------------------
 # Hybrid Storage Helper Functions
 # ---------------------------------------------------------
 def get_session(session_id: str) -> Dict[str, Any]:
-    """Get session from database or in-memory storage."""
-    # Always check DB first if available to ensure fresh state across workers
-    if USE_DATABASE:
+    """Get session from the shared store, database or in-memory storage."""
+    # The shared store is current for every worker - no Postgres read needed
+    if session_store:
+        try:
+            session_data = session_store.get(session_id)
+            if session_data:
+                SESSIONS[session_id] = session_data
+                return session_data
+        except Exception as e:
+            print(f" [WARNING] Session store lookup error: {e}")
+
+    # Otherwise check DB first if available to ensure fresh state across workers,
+    # unless this worker still has writes for the session that haven't landed
+    if USE_DATABASE and not (session_id in SESSIONS and write_behind.has_unsaved(session_id)):
         try:
             db_session = get_session_by_id(session_id)
             if db_session:
                 # Convert to dict and cache in memory (but DB is source of truth)
-                session_data = db_session.to_dict()
-                SESSIONS[session_id] = session_data
+                session_data = merge_db_session(session_id, db_session.to_dict(), SESSIONS.get(session_id))
+                persisted_versions[session_id] = db_session.version
+                store_session(session_id, session_data, check=False)
                 return session_data
         except Exception as e:
             print(f"Database lookup error: {e}")
 
     # Fallback to in-memory (legacy or if DB fails)
-    if session_id in SESSIONS:
-        return SESSIONS[session_id]
-    
-    return None
+    return SESSIONS.get(session_id)
 
 def get_authenticated_user():
     """Get the authenticated user from the Authorization header."""
@@ -111,13 +218,8 @@ def get_authenticated_user():
     if not auth_header:
         return None
     
-    try:
-        token = auth_header.replace("Bearer ", "")
-        res = supabase.auth.get_user(token)
-        return res.user
-    except Exception as e:
-        print(f"Auth error: {e}")
-        return None
+    token = auth_header.replace("Bearer ", "")
+    return token_verifier.verify(token)
 
 def verify_session_ownership(session_id: str, user_id: str = None) -> bool:
     """Verify that the session belongs to the specified user."""
@@ -138,37 +240,90 @@ def verify_session_ownership(session_id: str, user_id: str = None) -> bool:
     # Compare user IDs (convert to string for comparison)
     return str(session_user_id) == str(user_id)
 
-def save_session_to_db(session_id: str, session_data: dict, user_id: int = None):
-    """Save session to database (async-safe)."""
+def store_session(session_id: str, session_data: dict, check: bool = True):
+    """Cache the session locally and publish it to the shared store, if any.
+
+    With check=True a write based on an outdated copy raises SessionConflict
+    (and drops the local copy). Other store errors are only logged - the
+    Postgres checkpoint still has the session.
+    """
+    SESSIONS.set(session_id, session_data)
+    if not session_store:
+        return
+    try:
+        session_store.put(session_id, session_data, check=check)
+    except SessionConflict:
+        SESSIONS.pop(session_id, None)
+        raise
+    except Exception as e:
+        print(f" [WARNING] Session store write error: {e}")
+
+# How many transcript messages each session already has in practice_turns,
+# so a write only sends the new ones without looking that up first
+persisted_turns = SessionCache(max_entries=20000, max_bytes=0, ttl=float(os.getenv("SESSION_CACHE_TTL", "3600")))
+# practice_history.version as last read or written by this worker; a write
+# only lands if nobody else has written the session since
+persisted_versions = SessionCache(max_entries=20000, max_bytes=0, ttl=float(os.getenv("SESSION_CACHE_TTL", "3600")))
+# Sessions whose last write lost to another worker's. Queued writes fail after
+# the request was answered, so the session's next request gets the 409 instead
+write_conflicts = SessionCache(max_entries=20000, max_bytes=0, ttl=float(os.getenv("SESSION_CACHE_TTL", "3600")))
+
+def write_session_to_db(session_id: str, session_data: dict, user_id: int = None, report_type: str = None, metrics: dict = None):
+    """Upsert the session, its new turns and report metrics in one transaction.
+
+    Needs an app context; raises on failure, including StaleSessionError when
+    another worker wrote the session first.
+    """
+    transcript = session_data.get("transcript", [])
+    try:
+        version = persist_session(
+            session_id, session_data, user_id=user_id,
+            known_turns=persisted_turns.get(session_id),
+            report_type=report_type, metrics=metrics,
+            # With a shared store, revisions there already serialise writers and
+            # checkpoints from different workers may land in any order
+            expected_version=None if session_store else persisted_versions.get(session_id)
+        )
+    except StaleSessionError:
+        # Our copy is out of date - forget it so the next request reloads from the DB
+        print(f" [WARNING] Session {session_id} was changed by another worker; discarding stale write")
+        for cache in (SESSIONS, persisted_turns, persisted_versions):
+            cache.pop(session_id, None)
+        write_conflicts[session_id] = time.time()
+        raise
+    persisted_turns[session_id] = len(transcript)
+    persisted_versions[session_id] = version
+
+def save_session_to_db(session_id: str, session_data: dict, user_id: int = None, wait: bool = False, **report):
+    """Persist the session. Queued write-behind by default; wait=True writes before returning.
+
+    report_type/metrics (wait=True only) are written in the same transaction.
+    A failed wait=True write is logged and re-raised.
+    """
     if not USE_DATABASE:
         return
-    
+
+    if WRITE_BEHIND and not wait:
+        write_behind.enqueue(session_id, session_data, user_id=user_id)
+        return
+
     try:
         print(f"[DEBUG] Saving session {session_id} to DB (User: {user_id})...")
-        # We need an app context for threading
-        with app.app_context():
-            db_session = get_session_by_id(session_id)
-            if db_session:
-                # Update existing
-                update_session(session_id, {
-                    "transcript": session_data.get("transcript", []),
-                    "report_data": session_data.get("report_data", {}),
-                    "behaviour_analysis": session_data.get("report_data", {}).get("behaviour_analysis", []),
-                    "status": "completed" if session_data.get("completed") else "active"
-                })
-            else:
-                # Create new
-                create_session(session_id, {
-
-                    "role": session_data.get("role"),
-                    "ai_role": session_data.get("ai_role"),
-                    "scenario_type": session_data.get("scenario_type", "custom"),
-                    "title": session_data.get("title"), # Save title
-                    "mode": session_data.get("session_mode", "practice"),  # NEW: session mode
-                    "transcript": session_data.get("transcript", [])
-                }, user_id=user_id)
+        write_behind.write_now(session_id, session_data, user_id=user_id, **report)
     except Exception as e:
         print(f"Database save error: {e}")
+        if wait:
+            raise
+
+# Chat turns are written from a background thread so responses don't wait on the DB.
+# With a shared store the writer only checkpoints, coalescing SESSION_CHECKPOINT_INTERVAL seconds of turns
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() == "true"
+SESSION_CHECKPOINT_INTERVAL = float(os.getenv("SESSION_CHECKPOINT_INTERVAL", "30"))
+write_behind = WriteBehindQueue(
+    app, write_session_to_db,
+    delay=SESSION_CHECKPOINT_INTERVAL if session_store else float(os.getenv("WRITE_BEHIND_DELAY", "0.2")),
+    fatal_errors=(StaleSessionError,)  # retrying can't succeed
+)
 
 # ---------------------------------------------------------
 # Configuration & Paths
@@ -176,108 +331,162 @@ def save_session_to_db(session_id: str, session_data: dict, user_id: int = None)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 QUESTIONS_FILE = os.path.join(BASE_DIR, "framework_questions.json")
+FAISS_INDEX_FILE = os.getenv("FAISS_INDEX_FILE", os.path.join(BASE_DIR, "framework_faiss.index"))
+FAISS_META_FILE = os.getenv("FAISS_META_FILE", os.path.join(BASE_DIR, "framework_meta.json"))
+EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "3"))
+QUESTION_RETRIEVAL = os.getenv("QUESTION_RETRIEVAL", "vector").lower()
 
 connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 CONTAINER_NAME = "coact-ai-reports"
+BLOB_SINGLE_PUT_BYTES = int(float(os.getenv("BLOB_SINGLE_PUT_MB", "4")) * 1024 * 1024)
+BLOB_UPLOAD_CONCURRENCY = int(os.getenv("BLOB_UPLOAD_CONCURRENCY", "4"))
 MAX_TURNS = 15 
 
-if os.getenv("AZURE_OPENAI_ENDPOINT"):
-    USE_AZURE = True
-    client = AzureOpenAI(
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-03-01-preview"),
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-    )
-else:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Analyse each user turn in the background so /complete only synthesizes
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "true").lower() == "true"
+turn_analyzer = TurnAnalyzer(analyze_turn, SESSIONS.get, max_workers=int(os.getenv("TURN_ANALYSIS_WORKERS", "4")))
+
+def create_openai_client():
+    from openai import AzureOpenAI, OpenAI
+    if os.getenv("AZURE_OPENAI_ENDPOINT"):
+        return AzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-03-01-preview"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+        )
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+openai_client = Lazy("openai", create_openai_client)
 
 # --- Azure Blob Storage Client ---
-blob_service_client = None
-if connection_string:
+def create_blob_service():
+    """BlobServiceClient for the reports container, or None when storage isn't configured."""
+    if not connection_string:
+        return None
+    from azure.storage.blob import BlobServiceClient
     try:
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        # Ensure container exists
-        try:
-            container_client = blob_service_client.get_container_client(CONTAINER_NAME)
-            if not container_client.exists():
-                container_client.create_container()
-        except Exception as e:
-             print(f"Error checking/creating container: {e}")
+        # Reports above BLOB_SINGLE_PUT_MB go up as blocks, BLOB_UPLOAD_CONCURRENCY at a time
+        blob_service_client = BlobServiceClient.from_connection_string(
+            connection_string,
+            max_single_put_size=BLOB_SINGLE_PUT_BYTES,
+            max_block_size=BLOB_SINGLE_PUT_BYTES
+        )
     except Exception as e:
         print(f"Error initializing Blob Service Client: {e}")
-
-def upload_report_to_blob(local_path, blob_name):
-    """Upload PDF to Azure Blob and return a SAS URL."""
+        return None
+    # Ensure container exists
+    try:
+        container_client = blob_service_client.get_container_client(CONTAINER_NAME)
+        if not container_client.exists():
+            container_client.create_container()
+    except Exception as e:
+        print(f"Error checking/creating container: {e}")
+    return blob_service_client
+
+blob_service = Lazy("azure_blob", create_blob_service)
+
+def report_blob_name(session_id: str, report_hash: str) -> str:
+    """Blob for one version of a session's report; re-rendering the same content reuses it."""
+    return f"{session_id}_{report_hash[:16]}.pdf"
+
+# Report links are signed on demand from the stored blob name. A URL is handed
+# out again until it has less than REPORT_URL_RENEW_BEFORE seconds left
+REPORT_URL_TTL = float(os.getenv("REPORT_URL_TTL_HOURS", "24")) * 3600
+REPORT_URL_RENEW_BEFORE = min(3600, REPORT_URL_TTL / 4)
+report_urls = SessionCache(max_entries=20000, max_bytes=0, ttl=REPORT_URL_TTL)  # blob name -> (url, expires_at)
+
+def report_sas_url(blob_name: str):
+    """Read-only SAS URL for a report blob, reused while it has time left."""
+    cached = report_urls.get(blob_name)
+    if cached and cached[1] - time.time() > REPORT_URL_RENEW_BEFORE:
+        return cached[0]
+    blob_service_client = blob_service.get()
     if not blob_service_client:
         return None
+    from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+
+    expires_at = time.time() + REPORT_URL_TTL
+    sas_token = generate_blob_sas(
+        account_name=blob_service_client.account_name,
+        container_name=CONTAINER_NAME,
+        blob_name=blob_name,
+        account_key=blob_service_client.credential.account_key,
+        permission=BlobSasPermissions(read=True),
+        expiry=dt.datetime.fromtimestamp(expires_at, dt.timezone.utc)
+    )
+    # blob_client.url gives the primary endpoint URL + blob name; we append the SAS token
+    blob_client = blob_service_client.get_blob_client(container=CONTAINER_NAME, blob=blob_name)
+    url = f"{blob_client.url}?{sas_token}"
+    report_urls[blob_name] = (url, expires_at)
+    return url
+
+def upload_report_to_blob(pdf_bytes: bytes, blob_name: str) -> bool:
+    """Upload PDF bytes to Azure Blob. Returns False if storage is off or the upload failed."""
+    blob_service_client = blob_service.get()
+    if not blob_service_client:
+        return False
+    from azure.storage.blob import ContentSettings
     
     try:
         blob_client = blob_service_client.get_blob_client(container=CONTAINER_NAME, blob=blob_name)
         
-        with open(local_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+        blob_client.upload_blob(
+            pdf_bytes,
+            overwrite=True,
+            length=len(pdf_bytes),
+            max_concurrency=BLOB_UPLOAD_CONCURRENCY,
+            content_settings=ContentSettings(content_type="application/pdf")
+        )
             
         print(f" [SUCCESS] Uploaded {blob_name} to Azure Blob Storage.")
-        
-        # Generate SAS URL (valid for 24 hours)
-        sas_token = generate_blob_sas(
-            account_name=blob_service_client.account_name,
-            container_name=CONTAINER_NAME,
-            blob_name=blob_name,
-            account_key=blob_service_client.credential.account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=dt.datetime.utcnow() + dt.timedelta(hours=24)
-        )
-        
-        # Construct URL
-        # blob_client.url gives the primary endpoint URL + blob name
-        # We append the SAS token
-        sas_url = f"{blob_client.url}?{sas_token}"
-        return sas_url
+        return True
         
     except Exception as e:
-        print(f" [ERROR] Failed to upload/generate SAS for {blob_name}: {e}")
-        return None
+        print(f" [ERROR] Failed to upload {blob_name}: {e}")
+        return False
+
+def delete_report_blob(blob_name: str):
+    """Best-effort removal of a superseded report blob."""
+    try:
+        blob_service.get().get_blob_client(container=CONTAINER_NAME, blob=blob_name).delete_blob()
+    except Exception as e:
+        print(f" [WARNING] Could not delete old report blob {blob_name}: {e}")
 
 # ---------------------------------------------------------
 # Load Questions from JSON (RAG)
 # ---------------------------------------------------------
-questions_data = []
-
-def load_questions():
-    global questions_data
+def load_questions() -> List[Dict[str, Any]]:
     try:
         if os.path.exists(QUESTIONS_FILE):
             with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
                 questions_data = json.load(f)
             print(f"[SUCCESS] Loaded {len(questions_data)} questions from JSON.")
-        else:
-            print(f"[WARNING] Questions file not found at {QUESTIONS_FILE}.")
+            return questions_data
+        print(f"[WARNING] Questions file not found at {QUESTIONS_FILE}.")
     except Exception as e:
         print(f"[ERROR] Error loading questions: {e}")
+    return []
 
-load_questions()
+def embed_query(text: str) -> List[float]:
+    """Embedding for a retrieval query (same model vector_data.py built the index with)."""
+    client = openai_client.get()
+    res = client.with_options(timeout=EMBEDDING_TIMEOUT, max_retries=0).embeddings.create(model=EMBEDDING_DEPLOYMENT, input=text)
+    return res.data[0].embedding
+
+def create_question_retriever() -> QuestionRetriever:
+    retriever = QuestionRetriever(load_questions(), FAISS_INDEX_FILE, FAISS_META_FILE, embed_fn=embed_query, mode=QUESTION_RETRIEVAL)
+    retriever.load()
+    return retriever
+
+question_retriever = Lazy("question_index", create_question_retriever)
 
 def get_relevant_questions(user_text: str, active_frameworks: List[str], top_k: int = 5) -> List[str]:
-    """Simple keyword-based question retrieval (no FAISS needed)."""
-    if not questions_data:
+    """Top-k framework questions for the user's message (see QUESTION_RETRIEVAL)."""
+    retriever = question_retriever.get()
+    if not retriever.questions and not retriever.vector_enabled:
         return []
-    
-    # Simple matching - find questions from active frameworks
-    matches = []
-    user_lower = user_text.lower()
-    
-    for q in questions_data:
-        fw = q.get("framework", "")
-        if active_frameworks and fw not in active_frameworks:
-            continue
-        matches.append(f"[{fw} | {q.get('stage', '')}] {q.get('question', '')}")
-    
-    # Return random sample for variety
-    import random
-    if len(matches) > top_k:
-        return random.sample(matches, top_k)
-    return matches[:top_k]
+    return retriever.search(user_text, active_frameworks, top_k)
 
 # ---------------------------------------------------------
 # Helpers & Prompts
@@ -289,12 +498,101 @@ def sanitize_llm_output(s: str | None) -> str:
     if not s: return ""
     return s.strip().strip('"')
 
+def strip_hidden_tags(s: str) -> str:
+    """Remove [THOUGHT] blocks and <<...>> tags from a roleplay reply."""
+    visible = re.sub(r"\[THOUGHT\].*?\[/THOUGHT\]", "", s, flags=re.DOTALL).strip()
+    return re.sub(r"<<.*?>>", "", visible, flags=re.DOTALL).strip()
+
+def turn_context(sess: Dict[str, Any], turn_number: int):
+    """analyze_turn arguments for the session's turn_number-th user message (1-based), or None."""
+    seen, prior_ai_msg = 0, ""
+    for turn in sess.get("transcript", []):
+        if turn.get("role") != "user":
+            prior_ai_msg = turn.get("content") or ""
+            continue
+        seen += 1
+        if seen == turn_number:
+            return dict(
+                user_msg=turn.get("content") or "",
+                prior_ai_msg=strip_hidden_tags(prior_ai_msg),
+                role=sess.get("role"),
+                ai_role=sess.get("ai_role"),
+                scenario=sess.get("scenario"),
+                scenario_type=sess.get("scenario_type")
+            )
+    return None
+
+def collect_turn_digests(session_id: str, sess: Dict[str, Any]):
+    """Per-turn digests for the session, or None if any user turn is missing one."""
+    if not INCREMENTAL_ANALYSIS:
+        return None
+    user_turns = len([t for t in sess.get("transcript", []) if t.get("role") == "user"])
+    return turn_analyzer.collect(session_id, sess, user_turns, lambda turn: turn_context(sess, turn))
+
 def ensure_reports_dir() -> str:
     # Use path relative to BASE_DIR for reliability across environments
     reports_dir = os.path.join(BASE_DIR, "..", "reports")
     os.makedirs(reports_dir, exist_ok=True)
     return reports_dir
 
+# Report PDFs kept on local disk (no blob storage, or a failed upload), named by content hash
+report_file_cache = LocalReportCache(
+    os.getenv("REPORT_CACHE_DIR", os.path.join(ensure_reports_dir(), "cache")),
+    max_bytes=int(float(os.getenv("REPORT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+)
+
+def find_rendered_report(session_id: str, sess: Dict[str, Any], report_hash: str):
+    """{"report_blob": name} or {"report_file": path} if this exact report was already rendered, else None."""
+    if sess.get("report_hash") != report_hash:
+        return None
+    if blob_service.get():
+        blob_name = sess.get("report_blob") or report_blob_name(session_id, report_hash)
+        try:
+            if blob_service.get().get_blob_client(container=CONTAINER_NAME, blob=blob_name).exists():
+                return {"report_blob": blob_name}
+        except Exception as e:
+            print(f" [WARNING] Could not check cached report blob {blob_name}: {e}")
+    # Kept locally when there's no blob storage, or its upload failed
+    report_path = report_file_cache.get(report_hash)
+    return {"report_file": report_path} if report_path else None
+
+def report_location(sess: Dict[str, Any]):
+    """A fresh SAS URL for the session's report blob, else its local path (or None)."""
+    if sess.get("report_blob") and blob_service.get():
+        return report_sas_url(sess["report_blob"])
+    report_path = sess.get("report_file")
+    if report_path and report_path.startswith("http"):
+        return report_path  # URL stored by an older backend
+    if not report_path and sess.get("report_hash"):
+        # Sessions loaded from the DB only know the hash of their cached PDF
+        report_path = report_file_cache.get(sess["report_hash"])
+    return report_path
+
+# ---------------------------------------------------------
+# Local Report Serving
+# ---------------------------------------------------------
+# Without blob storage, /api/report streams PDFs from local disk. With
+# REPORT_ACCEL_REDIRECT set (e.g. /_reports/), Flask only answers with an
+# X-Accel-Redirect header and nginx sends the file from its internal
+# location over the shared reports volume, so no worker thread is tied up
+# copying bytes. Otherwise send_file answers If-None-Match and Range
+# itself; the ETag is the report's content hash, which stays stable when
+# the cache touches the file's mtime.
+REPORT_ACCEL_PREFIX = os.getenv("REPORT_ACCEL_REDIRECT", "").strip()
+
+def serve_report_file(report_path: str, etag: str = None):
+    """Response for a local report PDF: nginx X-Accel-Redirect when configured, else a conditional send_file."""
+    if REPORT_ACCEL_PREFIX:
+        cache_dir = os.path.realpath(report_file_cache.directory)
+        real_path = os.path.realpath(report_path)
+        # nginx only maps the cache directory; anything else (older report files) Flask serves
+        if os.path.dirname(real_path) == cache_dir:
+            resp = Response(mimetype="application/pdf")
+            resp.headers["X-Accel-Redirect"] = REPORT_ACCEL_PREFIX.rstrip("/") + "/" + os.path.basename(real_path)
+            resp.cache_control.no_cache = True
+            return resp
+    return send_file(report_path, mimetype="application/pdf", conditional=True, etag=etag or True)
+
 def detect_framework_fallback(text: str) -> str:
     text_lower = text.lower()
     keywords = {
@@ -455,12 +753,12 @@ START NOW. Speak ONLY as {ai_role}."""
 
     return [{"role": "system", "content": system}, {"role": "user", "content": '{"instruction": "Start coaching practice session"}'}]
 
-def build_followup_prompt(sess_dict, latest_user, rag_suggestions):
+def build_followup_prompt(sess_dict, latest_user, rag_suggestions, turn_summaries=None):
     """Build the follow-up prompt for coaching roleplay with feedback."""
     transcript = sess_dict.get("transcript", [])
-    history = [{"role": t["role"], "content": t["content"]} for t in transcript]
-    if latest_user: 
-        history.append({"role": "user", "content": latest_user})
+    # chat() has already appended the latest user line - it goes in the user message only
+    if latest_user and transcript and transcript[-1].get("role") == "user" and transcript[-1].get("content") == latest_user:
+        transcript = transcript[:-1]
 
     ai_role = sess_dict.get('ai_role', 'the other party')
     user_role = sess_dict.get('role', 'User')
@@ -469,6 +767,15 @@ def build_followup_prompt(sess_dict, latest_user, rag_suggestions):
     ai_character = sess_dict.get('ai_character', 'alex') # Default to alex
     turn_count = len([t for t in transcript if t.get('role') == 'user'])
 
+    # Compact, token-bounded history instead of the full transcript as JSON
+    budget_mode = "evaluation" if mode == "evaluation" else "mentorship" if sess_dict.get('scenario_type') == "mentorship" else "coaching"
+    conversation = compact_history(transcript, mode=budget_mode, turn_summaries=turn_summaries)
+
+    # Retrieved framework questions the mentor can draw on
+    reference_questions = ""
+    if rag_suggestions:
+        reference_questions = "\n### REFERENCE COACHING QUESTIONS (use if relevant):\n" + "\n".join(f"- {q}" for q in rag_suggestions) + "\n"
+
     # UNIFIED FOLLOW-UP LOGIC
     # Alex and Sarah are visually distinct but functionally identical adaptors.
     
@@ -495,7 +802,7 @@ You are playing: {ai_role}
 Current turn: {turn_count + 1}
 
 ### CONVERSATION SO FAR:
-{json.dumps(history, indent=2)}
+{conversation}
 
 ### YOUR RESPONSE FORMAT:
 [Your realistic response as {ai_role}]
@@ -518,8 +825,8 @@ Current turn: {turn_count + 1}
 {scenario}
 
 ### CONVERSATION SO FAR:
-{json.dumps(history, indent=2)}
-
+{conversation}
+{reference_questions}
 ### YOUR RESPONSE:
 Provide a response that demonstrates high-EQ, strategic communication.
 If the user asks a question, answer it as a Mentor.
@@ -558,7 +865,7 @@ You are playing: {ai_role}
 Current turn: {turn_count + 1}
 
 ### CONVERSATION SO FAR:
-{json.dumps(history, indent=2)}
+{conversation}
 
 ### YOUR RESPONSE FORMAT:
 [Your natural response as {ai_role}, varying based on the logic above]
@@ -589,13 +896,12 @@ def sync_user():
         return jsonify({"error": "No token provided"}), 401
     
     try:
-        token = auth_header.replace("Bearer ", "")
-        res = supabase.auth.get_user(token)
-        user = res.user
+        user = get_authenticated_user()
         
         if not user:
              return jsonify({"error": "Invalid token"}), 401
         
+        user_profiles.remember(user)
         # No local user table - Supabase Auth handles everything
         return jsonify({"success": True, "user": {"id": user.id, "email": user.email}})
         
@@ -603,23 +909,47 @@ def sync_user():
         print(f"Auth sync error: {e}")
         return jsonify({"error": str(e)}), 400
 
+HISTORY_MAX_PAGE_SIZE = 200
+
+def encode_history_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.session_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_history_cursor(cursor: str):
+    created_at, session_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+    return dt.datetime.fromisoformat(created_at), session_id
+
 @app.route("/api/history", methods=["GET"])
 def get_history():
-    """Get practice history for the authenticated user."""
+    """Get practice history for the authenticated user.
+
+    Returns summary rows only (no transcript/report_data). Optional paging:
+    ?limit=N&cursor=<X-Next-Cursor from the previous page>.
+    """
     auth_header = request.headers.get("Authorization")
     if not auth_header:
         return jsonify({"error": "Unauthorized"}), 401
         
     try:
-        token = auth_header.replace("Bearer ", "")
-        res = supabase.auth.get_user(token)
-        user = res.user
+        user = get_authenticated_user()
         
         if not user:
             return jsonify({"error": "Invalid token"}), 401
+
+        limit = request.args.get("limit", type=int)
+        if limit is not None:
+            limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        cursor = request.args.get("cursor")
+        try:
+            before = decode_history_cursor(cursor) if cursor else None
+        except Exception:
+            return jsonify({"error": "Invalid cursor"}), 400
             
-        sessions = get_user_history(user.id)
-        return jsonify([s.to_dict() for s in sessions])
+        sessions = get_user_history_page(user.id, limit=limit, before=before)
+        response = jsonify([s.to_summary_dict() for s in sessions])
+        if limit and len(sessions) == limit and sessions[-1].created_at:
+            response.headers["X-Next-Cursor"] = encode_history_cursor(sessions[-1])
+        return response
         
     except Exception as e:
         print(f"[ERROR] Failed to fetch history: {e}")
@@ -627,6 +957,22 @@ def get_history():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 400
 
+@app.route("/api/history/<session_id>", methods=["GET"])
+def get_history_detail(session_id: str):
+    """Full session (transcript and report data) for one history entry."""
+    user = get_authenticated_user()
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+    if not USE_DATABASE:
+        return jsonify({"error": "History not available"}), 404
+
+    db_sess = get_session_by_id(session_id)
+    if not db_sess:
+        return jsonify({"error": "Session not found"}), 404
+    if str(db_sess.user_id) != str(user.id):
+        return jsonify({"error": "Forbidden: This session belongs to another user"}), 403
+    return jsonify(db_sess.to_dict())
+
 @app.route("/api/health")
 def health_check():
     """Health check endpoint for VM monitoring"""
@@ -636,9 +982,19 @@ def health_check():
         "timestamp": dt.datetime.now().isoformat(),
         "version": "enhanced-reports-v1.0",
         "services": {
-            "llm": "connected" if client else "disconnected",
+            "llm": "connected" if openai_client.ready else "not initialised",
+            "lazy_clients": lazy_status(),
             "reports": "available",
-            "sessions": len(SESSIONS)
+            "sessions": len(SESSIONS),
+            "session_cache": SESSIONS.stats(),
+            "persistence": write_behind.stats(),
+            "auth": token_verifier.stats(),
+            "user_profiles": user_profiles.stats(),
+            "session_locks": session_locks.stats(),
+            "session_store": session_store.stats() if session_store else None,
+            "report_renderer": report_renderer.stats(),
+            "report_cache": report_file_cache.stats(),
+            "report_jobs": report_jobs.stats()
         }
     })
 
@@ -694,7 +1050,7 @@ def transcribe_audio():
             print(f" [INFO] Transcribing audio with Whisper ({WHISPER_MODEL})...")
             
             with open(read_path, "rb") as audio:
-                result = client.audio.transcriptions.create(
+                result = openai_client.get().audio.transcriptions.create(
                     model=WHISPER_MODEL,
                     file=audio,
                     language="en",
@@ -743,7 +1099,8 @@ def speak_text():
         print(f" [INFO] Generating TTS for: '{text[:20]}...' with voice: {voice} using model: {tts_model}")
 
         # OpenAI TTS (Standard) - Streaming
-        # Note: client is already initialized earlier in the file
+        # The OpenAI client is built on first use (see openai_client)
+        client = openai_client.get()
         from flask import Response, stream_with_context
         
         def generate():
@@ -914,6 +1271,7 @@ def start_session():
     # Get authenticated user from Authorization header
     user = get_authenticated_user()
     user_id = user.id if user else None
+    user_profiles.remember(user)
     
     if not user_id:
         print("[WARNING] Session created without user authentication")
@@ -950,7 +1308,7 @@ def start_session():
         "ai_character": ai_character, # PERSIST CHARACTER CHOICE
         "meta": {"framework_counts": {}, "relevance_issues": 0}
     }
-    SESSIONS[session_id] = session_data
+    store_session(session_id, session_data, check=False)
     
     # Save to database
     save_session_to_db(session_id, session_data, user_id=user_id)
@@ -966,16 +1324,58 @@ def start_session():
 
 
 
-@app.post("/api/session/<session_id>/chat")
-def chat(session_id: str):
-    sess = get_session(session_id)
-    if not sess: 
-        return jsonify({"error": "Session not found"}), 404
-    
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "Invalid JSON or Content-Type"}), 400
+# One chat turn per session at a time; a second request waits this long, then gets 409
+CHAT_LOCK_WAIT = float(os.getenv("CHAT_LOCK_WAIT", "10"))
+session_locks = SessionLocks()
+
+def parse_reply(raw_response: str):
+    """Visible text and detected framework (or None) for a raw LLM reply."""
+    clean_response = strip_hidden_tags(raw_response)
+    fw_match = re.search(r"<<FRAMEWORK:\s*(\w+)>>", raw_response)
+    detected_fw = fw_match.group(1).upper() if fw_match else None
+    if not detected_fw:
+        detected_fw = detect_framework_fallback(clean_response)
+    return clean_response, detected_fw
+
+def match_turn_seq(sess: Dict[str, Any], data: Dict[str, Any]):
+    """Check the client's turn_seq (1-based user turn number) against the transcript.
 
+    Returns None when the turn should run. A retry of a turn that already has
+    a reply gets that reply back instead of a second one; anything else that
+    doesn't line up is a conflict. Returns (payload, status) in those cases.
+    """
+    turn_seq = data.get("turn_seq")
+    if turn_seq is None:
+        return None
+    try:
+        turn_seq = int(turn_seq)
+    except (TypeError, ValueError):
+        return {"error": "turn_seq must be an integer"}, 400
+
+    transcript = sess["transcript"]
+    user_turns = [i for i, t in enumerate(transcript) if t.get("role") == "user"]
+    expected = len(user_turns) + 1
+    if turn_seq == expected:
+        return None
+
+    if 1 <= turn_seq < expected:
+        idx = user_turns[turn_seq - 1]
+        reply = transcript[idx + 1] if idx + 1 < len(transcript) else None
+        same_message = transcript[idx].get("content") == normalize_text(data.get("message", ""))
+        if reply and reply.get("role") == "assistant" and same_message:
+            clean_response, detected_fw = parse_reply(reply["content"])
+            return {
+                "follow_up": clean_response,
+                "framework_detected": detected_fw,
+                "framework_counts": sess["meta"].get("framework_counts", {}),
+                "turn_seq": turn_seq,
+                "replayed": True
+            }, 200
+
+    return {"error": "turn_seq does not match the session", "expected_turn_seq": expected}, 409
+
+def prepare_chat_turn(session_id: str, sess: Dict[str, Any], data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Record the user's message and build the LLM prompt for the reply."""
     user_msg = normalize_text(data.get("message", ""))
     audio_url = data.get("audio_url")
     
@@ -986,6 +1386,11 @@ def chat(session_id: str):
         "audio_url": audio_url
     })
 
+    # Start analysing this turn while the reply is generated
+    if INCREMENTAL_ANALYSIS:
+        turn_number = len([t for t in sess["transcript"] if t.get("role") == "user"])
+        turn_analyzer.submit(session_id, sess, turn_number, **turn_context(sess, turn_number))
+
     # Parse framework
     framework_raw = sess.get("framework")
     try:
@@ -1002,24 +1407,17 @@ def chat(session_id: str):
     active_fw = framework_data if isinstance(framework_data, list) else [framework_data]
     suggestions = get_relevant_questions(user_msg, active_fw)
     
-    messages = build_followup_prompt(sess, user_msg, suggestions)
-    raw_response = llm_reply(messages, max_tokens=300)
-    
+    turn_summaries = digest_summaries(sess) if INCREMENTAL_ANALYSIS else None
+    return build_followup_prompt(sess, user_msg, suggestions, turn_summaries=turn_summaries)
+
+def finalize_chat_turn(session_id: str, sess: Dict[str, Any], raw_response: str) -> Dict[str, Any]:
+    """Strip hidden tags, update framework counts and persist the assistant reply."""
     # 1. Extract Thought
     thought_match = re.search(r"\[THOUGHT\](.*?)\[/THOUGHT\]", raw_response, re.DOTALL)
     thought_content = thought_match.group(1).strip() if thought_match else None
     
-    # 2. Remove Thought
-    visible_response = re.sub(r"\[THOUGHT\].*?\[/THOUGHT\]", "", raw_response, flags=re.DOTALL).strip()
-    
-    # 3. Clean tags
-    clean_response = re.sub(r"<<.*?>>", "", visible_response, flags=re.DOTALL).strip()
-    
-    fw_match = re.search(r"<<FRAMEWORK:\s*(\w+)>>", raw_response)
-    detected_fw = fw_match.group(1).upper() if fw_match else None
-    
-    if not detected_fw:
-        detected_fw = detect_framework_fallback(clean_response)
+    # 2. Remove Thought and clean tags
+    clean_response, detected_fw = parse_reply(raw_response)
     
     if detected_fw: 
         counts = sess["meta"].get("framework_counts", {})
@@ -1028,23 +1426,166 @@ def chat(session_id: str):
         
     # Persist response
     sess["transcript"].append({"role": "assistant", "content": raw_response})
+    # Raises SessionConflict if another worker recorded a turn meanwhile
+    store_session(session_id, sess)  # also re-measures the grown transcript
     
     # Save to database
     save_session_to_db(session_id, sess)
- 
-    return jsonify({
+
+    return {
         "follow_up": clean_response, 
         "framework_detected": detected_fw,
-        "framework_counts": sess["meta"].get("framework_counts", {})
-    })
+        "framework_counts": sess["meta"].get("framework_counts", {}),
+        "turn_seq": sum(1 for t in sess["transcript"] if t.get("role") == "user")
+    }
 
-@app.post("/api/session/<session_id>/complete")
-def complete_session(session_id: str):
+def lock_session_for_turn(session_id: str):
+    """The session's lease, or None if another turn kept it busy past CHAT_LOCK_WAIT."""
+    try:
+        return session_locks.acquire(session_id, timeout=CHAT_LOCK_WAIT)
+    except SessionBusy:
+        print(f" [WARNING] Rejecting concurrent chat turn for session {session_id}")
+        return None
+
+SESSION_BUSY_ERROR = {"error": "Another message for this session is still being processed"}
+SESSION_CONFLICT_ERROR = {"error": "The session changed while this message was processed - reload and retry"}
+WRITE_LOST_ERROR = {"error": "Your previous message was not saved because the session was changed elsewhere - reload and retry", "write_lost": True}
+
+def take_write_conflict(session_id: str) -> bool:
+    """True (once) if a queued write for the session was discarded as stale since its last request."""
+    return write_conflicts.pop(session_id, None) is not None
+
+@app.post("/api/session/<session_id>/chat")
+def chat(session_id: str):
+    lease = lock_session_for_turn(session_id)
+    if not lease:
+        return jsonify(SESSION_BUSY_ERROR), 409
+
+    # Held from loading the session until the reply is recorded
+    with lease:
+        if take_write_conflict(session_id):
+            return jsonify(WRITE_LOST_ERROR), 409
+
+        sess = get_session(session_id)
+        if not sess: 
+            return jsonify({"error": "Session not found"}), 404
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Invalid JSON or Content-Type"}), 400
+
+        retried = match_turn_seq(sess, data)
+        if retried:
+            payload, status = retried
+            return jsonify(payload), status
+
+        messages = prepare_chat_turn(session_id, sess, data)
+        raw_response = llm_reply(messages, max_tokens=300)
+     
+        try:
+            return jsonify(finalize_chat_turn(session_id, sess, raw_response))
+        except SessionConflict:
+            return jsonify(SESSION_CONFLICT_ERROR), 409
+
+@app.post("/api/session/<session_id>/chat/stream")
+def chat_stream(session_id: str):
+    """Streaming variant of /chat: sends visible tokens as Server-Sent Events.
+
+    Emits `token` events with filtered text, then a single `done` event carrying
+    the same payload /chat returns. The full raw reply is persisted at the end.
+    """
+    lease = lock_session_for_turn(session_id)
+    if not lease:
+        return jsonify(SESSION_BUSY_ERROR), 409
+
+    try:
+        if take_write_conflict(session_id):
+            lease.release()
+            return jsonify(WRITE_LOST_ERROR), 409
+
+        sess = get_session(session_id)
+        if not sess: 
+            lease.release()
+            return jsonify({"error": "Session not found"}), 404
+        
+        data = request.get_json()
+        if not data:
+            lease.release()
+            return jsonify({"error": "Invalid JSON or Content-Type"}), 400
+
+        retried = match_turn_seq(sess, data)
+        if retried:
+            lease.release()
+            payload, status = retried
+            if status != 200:
+                return jsonify(payload), status
+            return Response(sse_event("done", payload), mimetype="text/event-stream")
+
+        messages = prepare_chat_turn(session_id, sess, data)
+    except Exception:
+        lease.release()
+        raise
+
+    state = {"recorded": False, "closed": False}
+
+    def end_turn():
+        if state["closed"]:
+            return
+        state["closed"] = True
+        if not state["recorded"]:
+            # No reply was recorded (error, or the client went away) - drop the user turn so a retry starts clean
+            sess["transcript"].pop()
+        lease.release()
+
+    def generate():
+        stripper = TagStripper()
+        parts = []
+        try:
+            try:
+                for chunk in llm_stream(messages):
+                    parts.append(chunk)
+                    visible = stripper.feed(chunk)
+                    if visible:
+                        yield sse_event("token", {"text": visible})
+                tail = stripper.flush()
+                if tail:
+                    yield sse_event("token", {"text": tail})
+            except Exception as e:
+                print(f" [ERROR] Chat stream error: {e}")
+                yield sse_event("error", {"error": str(e)})
+                if not parts:
+                    return
+
+            try:
+                payload = finalize_chat_turn(session_id, sess, "".join(parts).strip())
+            except SessionConflict:
+                yield sse_event("error", SESSION_CONFLICT_ERROR)
+                return
+            state["recorded"] = True
+            yield sse_event("done", payload)
+        finally:
+            end_turn()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable nginx proxy buffering for this response
+        }
+    )
+    response.call_on_close(end_turn)  # in case the stream is never iterated
+    return response
+
+def run_report_job(session_id: str, progress) -> Dict[str, Any]:
+    """Analyse, render, upload and persist a session report (runs on a job worker)."""
+    with app.app_context():
+        return _build_session_report(session_id, progress)
+
+def _build_session_report(session_id: str, progress) -> Dict[str, Any]:
     sess = get_session(session_id)
     if not sess: 
-        return jsonify({"error": "Not found"}), 404
-    
-    report_path = os.path.join(ensure_reports_dir(), f"{session_id}_report.pdf")
+        raise ValueError(f"Session {session_id} not found")
     
     try:
         framework_data = json.loads(sess["framework"]) if sess["framework"] and sess["framework"].startswith("[") else sess["framework"]
@@ -1064,6 +1605,7 @@ def complete_session(session_id: str):
     session_mode = sess.get("session_mode")
     
     # Generate report data if not present
+    progress("analysis")
     if not sess.get("report_data"):
         print(f"Generating report data for {session_id} (scenario_type: {scenario_type})...")
         try:
@@ -1076,67 +1618,75 @@ def complete_session(session_id: str):
                 mode=mode,
                 scenario_type=scenario_type,
                 ai_character=sess.get("ai_character", "alex"),
-                session_mode=session_mode
+                session_mode=session_mode,
+                turn_digests=collect_turn_digests(session_id, sess)
             )
             sess["report_data"] = data
+            turn_analyzer.discard(session_id)
         except Exception as e:
             print(f"Error generating data: {e}")
-            return jsonify({"error": str(e)}), 500
+            raise
     
-    # Fetch user name for report personalization
-    user_name = "Valued User"
+    # Fetch user name for report personalization (cached; admin API only on a miss)
     user_id = sess.get("user_id")
+    user_name = user_profiles.display_name(user_id)
     if user_id:
-        try:
-            print(f"Fetching user details for {user_id}...")
-            # Use supabase_admin to fetch user by ID (requires service role key)
-            user_res = supabase_admin.auth.admin.get_user_by_id(user_id)
-            if user_res and user_res.user:
-                meta = user_res.user.user_metadata or {}
-                user_name = meta.get("full_name") or meta.get("name") or meta.get("email") or "Valued User"
-                # If it's an email, strictly strip strictly to the name part if possible, otherwise keep as is
-                if "@" in user_name and "Valued" not in user_name:
-                    pass 
-                print(f" [SUCCESS] Resolved user name: {user_name}")
-        except Exception as e:
-            print(f" [WARNING] Failed to fetch user name: {e}")
-
-    # Generate PDF with unified structure
-    generate_report(
-        sess["transcript"], 
-        sess["role"], 
-        sess["ai_role"],
-        sess["scenario"], 
-        fw_display, 
-        filename=report_path,
+        print(f" [SUCCESS] Resolved user name: {user_name}")
+
+    # Rendered (and hashed) from the turns' role/content only, so an unchanged session always gets the same key
+    render_job = dict(
+        transcript=render_transcript(sess["transcript"]),
+        role=sess["role"],
+        ai_role=sess["ai_role"],
+        scenario=sess["scenario"],
+        framework=fw_display,
         mode=mode,
         precomputed_data=sess["report_data"],
         scenario_type=scenario_type,
         user_name=user_name,
         ai_character=sess.get("ai_character", "alex")
     )
-    
+    report_hash = report_key(render_job, report_template_version())
+    previous_hash = sess.get("report_hash")
     sess["completed"] = True
-    sess["report_file"] = report_path
-    
-    # --- UPLOAD TO BLOB STORAGE ---
-    blob_name = f"{session_id}_{int(dt.datetime.utcnow().timestamp())}.pdf"
-    sas_url = upload_report_to_blob(report_path, blob_name)
-    
-    if sas_url:
-        print(f" [INFO] specific report URL generated: {sas_url[:50]}...")
-        sess["report_file"] = sas_url # Save URL instead of local path
-        # Optionally delete local file to save space? 
-        # os.remove(report_path) 
+
+    # Same inputs and template as the last render (a retry, a double click) - reuse that PDF
+    location = find_rendered_report(session_id, sess, report_hash)
+    if location:
+        print(f" [PERF] Report for {session_id} unchanged ({report_hash[:12]}); reusing it")
+        progress("render", "skipped")
+        progress("upload", "skipped")
     else:
-        print(" [WARNING] Failed to upload report to blob. Keeping local path.")
+        # Generate PDF with unified structure (in a render worker process)
+        progress("render")
+        pdf_bytes = report_renderer.render(**render_job)
+        print(f"[SUCCESS] Unified report rendered: {len(pdf_bytes)} bytes (scenario: {scenario_type})")
+
+        # --- UPLOAD TO BLOB STORAGE ---
+        # Straight from memory; the PDF only touches local disk when there's no blob storage to take it
+        progress("upload", "running" if blob_service.get() else "skipped")
+        blob_name = report_blob_name(session_id, report_hash)
+        if upload_report_to_blob(pdf_bytes, blob_name):
+            location = {"report_blob": blob_name}
+            if previous_hash and previous_hash != report_hash:
+                delete_report_blob(sess.get("report_blob") or report_blob_name(session_id, previous_hash))
+        else:
+            if blob_service.get():
+                print(" [WARNING] Failed to upload report to blob. Keeping local copy.")
+            location = {"report_file": report_file_cache.put(report_hash, pdf_bytes)}
+            print(f"[SUCCESS] Unified report saved: {location['report_file']}")
+
+    # The blob name (or local path) is the durable reference; links are signed when the report is opened
+    sess["report_blob"] = location.get("report_blob")
+    sess["report_file"] = location.get("report_file")
+    sess["report_hash"] = report_hash
+    sess["report_template"] = report_template_version()
     
     # --- PERSISTENCE LAYER ---
+    progress("persist")
+    store_session(session_id, sess, check=False)  # re-measure now that report_data is filled
     try:
-        # 1. Save full JSON report to practice_history
-        save_session_to_db(session_id, sess, user_id=user_id)
-        
-        # 2. Extract and save structured metrics to specific tables
+        # 1. Extract structured metrics for the analytics tables
         metrics = {}
         report_data = sess["report_data"]
         
@@ -1177,23 +1727,100 @@ def complete_session(session_id: str):
             metrics["skill_focus_areas"] = report_data.get("skill_focus_areas", [])
             metrics["practice_suggestions"] = report_data.get("practice_plan", [])
 
-        # Save to specific analytics tables
-        save_report_metrics(session_id, scenario_type, metrics, user_id=user_id)
+        # 2. Report JSON, remaining turns and metrics rows - one transaction, one commit
+        save_session_to_db(session_id, sess, user_id=user_id, wait=True, report_type=scenario_type, metrics=metrics)
         
     except Exception as e:
+        # Fail the job: a report the DB doesn't know about isn't "completed"
         print(f" [ERROR] DB Persistence Error: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
+
+    # Job results are stored and served without auth - point at the checked endpoint, never a signed link
+    return {"report_url": f"/api/report/{session_id}", "scenario_type": scenario_type}
 
-    return jsonify({"message": "Report generated", "report_file": report_path, "scenario_type": scenario_type})
+report_jobs = ReportJobQueue(
+    os.getenv("REPORT_JOBS_DB", os.path.join(ensure_reports_dir(), "report_jobs.sqlite3")),
+    handler=run_report_job,
+    max_workers=int(os.getenv("REPORT_JOB_WORKERS", "2")),
+    max_attempts=int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", "3"))
+)
+
+@app.post("/api/session/<session_id>/complete")
+def complete_session(session_id: str):
+    """Queue report generation and return immediately with a job id."""
+    if take_write_conflict(session_id):
+        return jsonify(WRITE_LOST_ERROR), 409
+
+    sess = get_session(session_id)
+    if not sess: 
+        return jsonify({"error": "Not found"}), 404
+
+    job = report_jobs.enqueue(session_id)
+    return jsonify({
+        "message": "Report generation started",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['job_id']}"
+    }), 202
+
+@app.get("/api/jobs/<job_id>")
+def get_job_status(job_id: str):
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.get("/api/jobs/<job_id>/events")
+def stream_job_status(job_id: str):
+    """Push job progress as Server-Sent Events until the job finishes."""
+    job = report_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        last_seen = None
+        while True:
+            current = report_jobs.get(job_id)
+            if current["updated_at"] != last_seen:
+                last_seen = current["updated_at"]
+                yield sse_event("progress", current)
+            if current["status"] in TERMINAL_STATUSES:
+                yield sse_event("done" if current["status"] == "completed" else "error", current)
+                return
+            time.sleep(1)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def report_access_error(session_user_id, user):
+    """(payload, status) if `user` may not see this session's report, else None.
+
+    Sessions with a user_id need that user's token; guest sessions are open.
+    """
+    if not session_user_id:
+        return None
+    if not user:
+        return {"error": "Unauthorized: This session requires authentication"}, 401
+    if str(session_user_id) != str(user.id):
+        return {"error": "Forbidden: This session belongs to another user"}, 403
+    return None
 
 @app.get("/api/report/<session_id>")
 def view_report(session_id: str):
-    sess = SESSIONS.get(session_id)
+    # Sessions this worker doesn't hold (restarts, other workers) come from the store or DB
+    sess = SESSIONS.get(session_id) or get_session(session_id)
     if not sess: 
         return jsonify({"error": "No report"}), 404
+
+    denied = report_access_error(sess.get("user_id"), get_authenticated_user())
+    if denied:
+        payload, status = denied
+        return jsonify(payload), status
         
-    report_path = sess.get("report_file")
+    report_path = report_location(sess)
     
     # If it's a URL (starts with http), redirect or return it
     if report_path and report_path.startswith("http"):
@@ -1202,7 +1829,7 @@ def view_report(session_id: str):
     if not report_path or not os.path.exists(report_path):
         return jsonify({"error": "Report file not found"}), 404
     
-    return send_file(report_path, mimetype='application/pdf')
+    return serve_report_file(report_path, etag=sess.get("report_hash"))
 
 @app.get("/api/session/<session_id>/report_data")
 def get_report_data(session_id: str):
@@ -1213,16 +1840,11 @@ def get_report_data(session_id: str):
     # Check in-memory first
     sess = SESSIONS.get(session_id)
     if sess:
-        # If session has a user_id and user is authenticated, verify ownership
-        session_user_id = sess.get("user_id")
-        if session_user_id:
-            # Session has a user - requires authentication
-            if not user:
-                return jsonify({"error": "Unauthorized: This session requires authentication"}), 401
-            # Verify it belongs to the authenticated user
-            if str(session_user_id) != str(user.id):
-                return jsonify({"error": "Forbidden: This session belongs to another user"}), 403
-        # else: session has no user_id (guest session) - allow access without authentication
+        # Sessions with a user_id need that user's token; guest sessions are open
+        denied = report_access_error(sess.get("user_id"), user)
+        if denied:
+            payload, status = denied
+            return jsonify(payload), status
     else:
         # Check database
         if USE_DATABASE:
@@ -1231,17 +1853,14 @@ def get_report_data(session_id: str):
             if not db_sess:
                 return jsonify({"error": "Session not found"}), 404
             
-            # If session has a user_id, require authentication and ownership verification
-            if db_sess.user_id:
-                if not user:
-                    return jsonify({"error": "Unauthorized: This session requires authentication"}), 401
-                if str(db_sess.user_id) != str(user.id):
-                    return jsonify({"error": "Forbidden: This session belongs to another user"}), 403
-            # else: guest session - allow access
+            denied = report_access_error(db_sess.user_id, user)
+            if denied:
+                payload, status = denied
+                return jsonify(payload), status
             
             # Load into memory for processing
-            sess = db_sess.to_dict()
-            SESSIONS[session_id] = sess
+            sess = merge_db_session(session_id, db_sess.to_dict())
+            store_session(session_id, sess, check=False)
         else:
              return jsonify({"error": "Session not found"}), 404
 
@@ -1255,6 +1874,11 @@ def get_report_data(session_id: str):
         response["scenario_type"] = sess.get("scenario_type", response.get("scenario_type", "custom"))
         return jsonify(response)
         
+    # A queued/running report job will produce the data - don't analyse twice
+    job = report_jobs.active_job_for(session_id)
+    if job:
+        return jsonify(job), 202, {"Retry-After": "2"}
+
     # Generate new data if not present
     scenario_type = sess.get("scenario_type")
     print(f"Generating report data for {session_id} (scenario_type: {scenario_type})...")
@@ -1275,9 +1899,12 @@ def get_report_data(session_id: str):
             fw_arg,
             mode=mode,
             scenario_type=scenario_type,
-            ai_character=sess.get("ai_character", "alex")
+            ai_character=sess.get("ai_character", "alex"),
+            turn_digests=collect_turn_digests(session_id, sess)
         )
         sess["report_data"] = data
+        store_session(session_id, sess, check=False)
+        turn_analyzer.discard(session_id)
         
         response = data.copy()
         response["transcript"] = sess["transcript"]
@@ -1326,8 +1953,59 @@ def clear_sessions():
         return jsonify({"error": str(e)}), 500
 
 
+# ---------------------------------------------------------
+# Background Services & Startup Warmup
+# ---------------------------------------------------------
+# Importing app.py builds the services but starts nothing: the render pool,
+# the write-behind and JWKS threads, report job recovery and the warmup are
+# started by start_background_services(), once per serving process.
+# `python app.py` calls it before serving - except in the debug reloader's
+# parent process, which only watches files and never serves a request. Under
+# a WSGI server it runs before the first request.
+#
+# SDK clients and the question index are lazy (see startup.py). By default
+# they are built in a background thread at startup, so the worker serves
+# /api/health at once and the first chat doesn't pay for them.
+# STARTUP_WARMUP=off leaves them to the first request that needs each one.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+_services_lock = threading.Lock()
+_services_started = False
+
+def start_background_services():
+    global _services_started
+    if _services_started:
+        return
+    with _services_lock:
+        if _services_started:
+            return
+        # Fork the render workers before this process starts any thread of its own
+        report_renderer.start()
+        atexit.register(report_renderer.shutdown)
+        token_verifier.start()
+        write_behind.start()
+        atexit.register(write_behind.shutdown)
+        report_jobs.recover()
+        if STARTUP_WARMUP == "background":
+            threading.Thread(target=warmup, name="startup-warmup", daemon=True).start()
+        _services_started = True
+
+@app.before_request
+def ensure_background_services():
+    if not _services_started:
+        start_background_services()
+
+if PROFILE_STARTUP:
+    # Build everything in the foreground so the profile includes it, then exit without serving
+    warmup()
+    startup_profile.stop()
+    print(startup_profile.report(min_ms=float(os.getenv("STARTUP_PROFILE_MIN_MS", "5"))))
+    sys.exit(0)
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
+    # debug=True runs a reloader parent that re-executes this script as WERKZEUG_RUN_MAIN=true to serve
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
     app.run(host="0.0.0.0", port=port, debug=True)
 
 if __name__ == '__main__':
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import jwt
+
+# ---------------------------------------------------------
+# Local Supabase Token Verification
+# ---------------------------------------------------------
+# supabase.auth.get_user(token) is an HTTPS round trip to Supabase Auth on
+# every authenticated request. Access tokens are JWTs, so we verify them here:
+#   - HS256 tokens with the project's JWT secret (SUPABASE_JWT_SECRET)
+#   - asymmetric tokens (RS256/ES256) with the project's JWKS, refreshed in
+#     the background
+# Verified claims are cached briefly by token hash. When no local key can
+# check a token, the network call is used as a fallback (if enabled).
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+
+class AuthUser:
+    """The parts of a Supabase user the app uses, built from token claims."""
+
+    def __init__(self, claims: Dict[str, Any]):
+        self.claims = claims
+        self.id = claims.get("sub")
+        self.email = claims.get("email")
+        self.role = claims.get("role")
+        self.user_metadata = claims.get("user_metadata") or {}
+        self.app_metadata = claims.get("app_metadata") or {}
+
+    @classmethod
+    def from_supabase(cls, user) -> "AuthUser":
+        return cls({
+            "sub": str(user.id),
+            "email": getattr(user, "email", None),
+            "role": getattr(user, "role", None),
+            "user_metadata": getattr(user, "user_metadata", None) or {},
+            "app_metadata": getattr(user, "app_metadata", None) or {},
+        })
+
+
+class TokenVerifier:
+    """Verifies Supabase access tokens locally, with a claims cache and network fallback."""
+
+    def __init__(self, supabase_url: str, jwt_secret: str = None, audience: str = "authenticated",
+                 fallback: Optional[Callable[[str], Any]] = None, cache_ttl: float = 60,
+                 cache_size: int = 10000, jwks_refresh: float = 600, leeway: float = 10):
+        self.issuer = f"{supabase_url.rstrip('/')}/auth/v1" if supabase_url else None
+        self.jwks_url = f"{self.issuer}/.well-known/jwks.json" if self.issuer else None
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.fallback = fallback
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.jwks_refresh = jwks_refresh
+        self.leeway = leeway
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # token hash -> (user, expires_at)
+        self._keys: Dict[str, Any] = {}  # kid -> PyJWK
+        self._keys_loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.counters = {"cache_hits": 0, "verified_locally": 0, "fallback": 0, "rejected": 0}
+        self._started = False
+
+    # --- Public API ---
+
+    def start(self):
+        """Start refreshing the JWKS in the background (once)."""
+        if self.jwks_url and not self._started:
+            self._started = True
+            # First fetch happens on the thread too, so startup never waits on Supabase
+            threading.Thread(target=self._refresh_loop, name="jwks-refresh", daemon=True).start()
+
+    def verify(self, token: str) -> Optional[AuthUser]:
+        """The user for a valid token, or None."""
+        if not token:
+            return None
+        token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(token_hash)
+            if entry and entry[1] > now:
+                self._cache.move_to_end(token_hash)
+                self.counters["cache_hits"] += 1
+                return entry[0]
+
+        try:
+            claims = self._decode(token)
+        except LookupError:
+            # No local key can check this token - ask Supabase
+            return self._verify_remote(token, token_hash)
+        except jwt.InvalidTokenError as e:
+            self._count("rejected")
+            print(f"Auth error: {e}")
+            return None
+
+        self._count("verified_locally")
+        user = AuthUser(claims)
+        self._remember(token_hash, user, min(now + self.cache_ttl, claims["exp"]))
+        return user
+
+    def refresh_keys(self) -> bool:
+        """Fetch the JWKS. Returns False (keeping the old keys) on failure."""
+        if not self.jwks_url:
+            return False
+        with self._refresh_lock:
+            try:
+                with urllib.request.urlopen(self.jwks_url, timeout=5) as res:
+                    jwks = json.load(res)
+                keys = {}
+                for jwk in jwks.get("keys", []):
+                    try:
+                        key = jwt.PyJWK.from_dict(jwk)
+                    except jwt.PyJWTError:
+                        continue  # symmetric or unsupported key types aren't published for verification
+                    keys[jwk.get("kid")] = key
+                self._keys = keys
+                self._keys_loaded_at = time.time()
+                return True
+            except Exception as e:
+                print(f" [WARNING] Could not refresh Supabase JWKS: {e}")
+                return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            cached = len(self._cache)
+        return {
+            **counters,
+            "cached_tokens": cached,
+            "jwks_keys": len(self._keys),
+            "jwks_age_seconds": round(time.time() - self._keys_loaded_at) if self._keys_loaded_at else None,
+            "hs256_secret": bool(self.jwt_secret),
+            "network_fallback": self.fallback is not None,
+        }
+
+    # --- Internals ---
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+        if alg == "HS256":
+            if not self.jwt_secret:
+                raise LookupError("no JWT secret configured")
+            key = self.jwt_secret
+        elif alg in ASYMMETRIC_ALGORITHMS:
+            key = self._keys.get(header.get("kid"))
+            if key is None and self._keys_loaded_at and time.time() - self._keys_loaded_at > 30:
+                # Keys may have rotated since the last refresh
+                self.refresh_keys()
+                key = self._keys.get(header.get("kid"))
+            if key is None:
+                raise LookupError(f"unknown signing key {header.get('kid')}")
+        else:
+            raise jwt.InvalidAlgorithmError(f"unsupported token algorithm {alg}")
+
+        options = {"require": ["exp", "sub"]}
+        if not self.issuer:
+            options["verify_iss"] = False
+        return jwt.decode(
+            token, key, algorithms=[alg], audience=self.audience, issuer=self.issuer,
+            leeway=self.leeway, options=options
+        )
+
+    def _verify_remote(self, token: str, token_hash: str) -> Optional[AuthUser]:
+        if not self.fallback:
+            self._count("rejected")
+            return None
+        self._count("fallback")
+        try:
+            user = self.fallback(token)
+        except Exception as e:
+            print(f"Auth error: {e}")
+            return None
+        if not user:
+            return None
+        user = AuthUser.from_supabase(user)
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            exp = None
+        expires_at = time.time() + self.cache_ttl
+        self._remember(token_hash, user, min(expires_at, exp) if exp else expires_at)
+        return user
+
+    def _remember(self, token_hash: str, user: AuthUser, expires_at: float):
+        with self._lock:
+            self._cache[token_hash] = (user, expires_at)
+            self._cache.move_to_end(token_hash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh_keys()
+            time.sleep(self.jwks_refresh)
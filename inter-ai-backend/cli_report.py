@@ -4,26 +4,33 @@ import math
 import re
 import unicodedata
 import datetime as dt
+import threading
+import types
+from collections import OrderedDict
+import fpdf
+# DashboardPDF extends PyFPDF internals (font subsetting, resource objects),
+# so it only works with the version requirements.txt pins
+FPDF_REQUIRED_VERSION = "1.7.2"
+if getattr(fpdf, "FPDF_VERSION", None) != FPDF_REQUIRED_VERSION:
+    raise ImportError(f"cli_report needs PyFPDF {FPDF_REQUIRED_VERSION} (pip install fpdf=={FPDF_REQUIRED_VERSION}), found {getattr(fpdf, 'FPDF_VERSION', 'unknown')}")
+import fpdf.fpdf
 from fpdf import FPDF
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from fpdf.ttfonts import TTFontFile
 from dotenv import load_dotenv
-import httpx
 import concurrent.futures
+from startup import Lazy
 
 
 load_dotenv()
 
-import matplotlib
-matplotlib.use('Agg') # Non-interactive backend
-import matplotlib.pyplot as plt
-import numpy as np
-import tempfile
 
 USE_AZURE = True
 # ... imports ... 
 def setup_langchain_model():
+    # langchain_openai/httpx are imported on first use - report render workers never need them
+    import httpx
+    from langchain_openai import AzureChatOpenAI, ChatOpenAI
+
     # Force httpx to ignore system proxies which cause hangs on Azure VMs
     http_client = httpx.Client(trust_env=False, timeout=30.0)
     
@@ -43,7 +50,7 @@ def setup_langchain_model():
         temperature=0.4
     )
 
-llm = setup_langchain_model()
+llm = Lazy("langchain_llm", setup_langchain_model)
 
 MODEL_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", os.getenv("MODEL_NAME", "gpt-4.1-mini"))
 
@@ -104,9 +111,115 @@ SCENARIO_TITLES = {
 }
 
 
+# ---------------------------------------------------------
+# Report Fonts (Unicode TTF)
+# ---------------------------------------------------------
+# With DejaVu Sans available, reports are set in it instead of the core
+# Arial font: text goes into the PDF as Unicode - curly quotes, dashes and
+# non-Latin names survive - and no longer runs through the latin-1
+# replacement table. Glyph metrics are parsed once per process, and only
+# the glyphs a report uses are embedded. Subsets are rounded up to whole
+# 32-codepoint blocks and memoised, so reports in the same scripts reuse
+# one subset instead of re-reading the TTF on every render. Without the
+# font files (REPORT_FONT_DIR), reports fall back to Arial and latin-1.
+# All of this is confined to DashboardPDF; fpdf itself is left unpatched.
+REPORT_FONT_DIR = os.getenv("REPORT_FONT_DIR", "/usr/share/fonts/truetype/dejavu")
+REPORT_FONT_FILES = {
+    "": "DejaVuSans.ttf",
+    "B": "DejaVuSans-Bold.ttf",
+    "I": "DejaVuSans-Oblique.ttf",       # fonts-dejavu-extra; upright face used if missing
+    "BI": "DejaVuSans-BoldOblique.ttf",
+}
+UNICODE_FAMILY = "dejavu"
+SUBSET_CACHE_SIZE = 32
+
+# Characters the PDF can't carry with a BMP TrueType font: control codes,
+# joiners/variation selectors and anything outside the BMP (emoji)
+_UNRENDERABLE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\u200b-\u200d\ufe0e\ufe0f\ud800-\udfff\U00010000-\U0010ffff]")
+
+
+_font_cache = OrderedDict()  # subsets and width arrays, keyed by font file + glyph set
+_font_cache_lock = threading.Lock()
+
+
+def _font_cached(key, build):
+    """LRU-memoised build() for font data that only depends on `key`."""
+    with _font_cache_lock:
+        if key in _font_cache:
+            _font_cache.move_to_end(key)
+            return _font_cache[key]
+    value = build()
+    with _font_cache_lock:
+        _font_cache[key] = value
+        while len(_font_cache) > SUBSET_CACHE_SIZE:
+            _font_cache.popitem(last=False)
+    return value
+
+
+class CachedTTFontFile(TTFontFile):
+    """fpdf's TrueType subsetter, memoised per (font file, glyph set)."""
+
+    def makeSubset(self, file, subset):
+        def build():
+            stream = super(CachedTTFontFile, self).makeSubset(file, subset)
+            return stream, dict(self.codeToGlyph), self.maxUni
+
+        stream, code_to_glyph, self.maxUni = _font_cached(("subset", file, frozenset(subset)), build)
+        self.codeToGlyph = dict(code_to_glyph)
+        return stream
+
+
+def _load_ttf(path, style):
+    """The font entry FPDF.add_font(uni=True) builds, without its .pkl metrics cache."""
+    ttf = TTFontFile()
+    ttf.getMetrics(path)
+    return {
+        'type': 'TTF', 'name': re.sub('[ ()]', '', ttf.fullName),
+        'desc': {
+            'Ascent': int(round(ttf.ascent, 0)),
+            'Descent': int(round(ttf.descent, 0)),
+            'CapHeight': int(round(ttf.capHeight, 0)),
+            'Flags': ttf.flags,
+            'FontBBox': "[%s %s %s %s]" % tuple(int(round(v, 0)) for v in ttf.bbox[:4]),
+            'ItalicAngle': int(ttf.italicAngle),
+            'StemV': int(round(ttf.stemV, 0)),
+            'MissingWidth': int(round(ttf.defaultWidth, 0)),
+        },
+        'up': round(ttf.underlinePosition), 'ut': round(ttf.underlineThickness),
+        'cw': ttf.charWidths, 'ttffile': path, 'fontkey': UNICODE_FAMILY + style,
+        'subset': list(range(0, 32)), 'unifilename': None,
+    }
+
+
+def load_report_fonts():
+    """{style: font entry} for the Unicode family, or None to use the core fonts."""
+    if os.getenv("REPORT_UNICODE_FONT", "true").lower() != "true":
+        return None
+    paths = {style: os.path.join(REPORT_FONT_DIR, name) for style, name in REPORT_FONT_FILES.items()}
+    paths = {style: path for style, path in paths.items() if os.path.exists(path)}
+    if "" not in paths:
+        print(f" [WARNING] {REPORT_FONT_FILES['']} not found in {REPORT_FONT_DIR} - reports use Arial (latin-1 only).")
+        return None
+    # Metrics are kept in this process; no .pkl files are written next to the fonts
+    return {style: _load_ttf(path, style) for style, path in paths.items()}
+
+report_fonts = Lazy("report_fonts", load_report_fonts)
+
+# Bump whenever the PDF layout changes: cached reports from another version are re-rendered
+REPORT_TEMPLATE_VERSION = "2026.10.1"
+
+
+def report_template_version():
+    """Template version plus the font mode, which changes the output too."""
+    return REPORT_TEMPLATE_VERSION + ("+unicode" if report_fonts.get() else "+core")
+
+
 def sanitize_text(text):
     if text is None: return ""
     text = str(text)
+    if report_fonts.get():
+        # The Unicode font takes the text as-is
+        return _UNRENDERABLE.sub("", text)
     # Common replacements to help latin-1
     replacements = {
         '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
@@ -169,12 +282,19 @@ def llm_reply(messages, max_tokens=4000):
     try:
         print(f" [DEBUG] llm_reply using LangChain model", flush=True)
         # LangChain accepts list of dicts directly in invoke
-        response = llm.invoke(messages)
+        response = llm.get().invoke(messages)
         return response.content.strip()
     except Exception as e:
         print(f"LLM Error: {e}")
         return "{}"
 
+def llm_stream(messages):
+    """Yield completion text chunks as the model produces them."""
+    print(f" [DEBUG] llm_stream using LangChain model", flush=True)
+    for chunk in llm.get().stream(messages):
+        if chunk.content:
+            yield chunk.content
+
 def detect_scenario_type(scenario: str, ai_role: str, role: str) -> str:
     """Detect scenario type based on content to determine report structure."""
     scenario_lower = scenario.lower()
@@ -236,6 +356,15 @@ def detect_user_role_context(role: str, ai_role: str) -> str:
 # NEW: Parallel Analysis Functions for Speed Optimization
 # =====================================================================
 
+# Traits required for success, by scenario type
+REQUIRED_TRAITS_MAP = {
+    "coaching": ["Openness to Feedback", "Accountability", "Active Listening", "Growth Mindset"],
+    "negotiation": ["Rapport Building", "Active Listening", "Value Focus", "Confidence"],
+    "sales": ["Rapport Building", "Active Listening", "Value Focus", "Confidence"],
+    "learning": ["Curiosity", "Reflection", "Openness"],
+    "mentorship": ["Observation", "Question Asking", "Pattern Recognition"]
+}
+
 def analyze_character_traits(transcript, role, ai_role, scenario, scenario_type):
     """
     Analyze user's character/personality traits and assess fit for the scenario.
@@ -247,16 +376,7 @@ def analyze_character_traits(transcript, role, ai_role, scenario, scenario_type)
     
     conversation = "\n".join([f"USER: {t['content']}" for t in user_msgs])
     
-    # Define required traits based on scenario type
-    required_traits_map = {
-        "coaching": ["Openness to Feedback", "Accountability", "Active Listening", "Growth Mindset"],
-        "negotiation": ["Rapport Building", "Active Listening", "Value Focus", "Confidence"],
-        "sales": ["Rapport Building", "Active Listening", "Value Focus", "Confidence"],
-        "learning": ["Curiosity", "Reflection", "Openness"],
-        "mentorship": ["Observation", "Question Asking", "Pattern Recognition"]
-    }
-    
-    required_traits = required_traits_map.get(scenario_type, ["Professional Communication"])
+    required_traits = REQUIRED_TRAITS_MAP.get(scenario_type, ["Professional Communication"])
     
     prompt = f"""
 You are analyzing a user's CHARACTER and PERSONALITY in a {scenario_type} simulation.
@@ -300,6 +420,8 @@ Be SPECIFIC. Quote EXACT words. No generic advice.
 """
     
     try:
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import JsonOutputParser
         parser = JsonOutputParser()
         prompt_template = PromptTemplate(
             template="{prompt}\n\n{format_instructions}",
@@ -307,7 +429,7 @@ Be SPECIFIC. Quote EXACT words. No generic advice.
             partial_variables={"format_instructions": parser.get_format_instructions()}
         )
         
-        chain = prompt_template | llm | parser
+        chain = prompt_template | llm.get() | parser
         result = chain.invoke({"prompt": prompt})
         print(" [SUCCESS] Character analysis completed")
         return result
@@ -387,6 +509,8 @@ Categorize each question and specify optimal timing in the conversation.
 """
     
     try:
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import JsonOutputParser
         parser = JsonOutputParser()
         prompt_template = PromptTemplate(
             template="{prompt}\n\n{format_instructions}",
@@ -394,7 +518,7 @@ Categorize each question and specify optimal timing in the conversation.
             partial_variables={"format_instructions": parser.get_format_instructions()}
         )
         
-        chain = prompt_template | llm | parser
+        chain = prompt_template | llm.get() | parser
         result = chain.invoke({"prompt": prompt})
         print(" [SUCCESS] Question analysis completed")
         return result
@@ -410,9 +534,142 @@ Categorize each question and specify optimal timing in the conversation.
         }
 
 
-def analyze_full_report_data(transcript, role, ai_role, scenario, framework=None, mode="coaching", scenario_type=None, ai_character="alex", session_mode=None):
+# =====================================================================
+# Incremental Per-Turn Analysis
+# =====================================================================
+
+def analyze_turn(user_msg, prior_ai_msg, role, ai_role, scenario, scenario_type, turn_number):
+    """
+    Extract compact evidence from ONE user turn while the session is still running.
+    The final report is later synthesized from these digests instead of the transcript.
+    """
+    prompt = f"""
+You are logging evidence from ONE turn of a {scenario_type} roleplay simulation.
+
+USER ROLE: {role}
+AI ROLE: {ai_role}
+SCENARIO: {scenario}
+
+TURN {turn_number}
+AI SAID: {prior_ai_msg}
+USER REPLIED: {user_msg}
+
+Return VALID JSON with this EXACT structure:
+{{
+  "quote": "The most telling verbatim phrase from the user's reply",
+  "eq_nuance": {{"nuance": "User's tone/emotion", "observation": "Evidence for it", "suggestion": "Better emotional adjustment"}},
+  "questions_asked": ["Verbatim questions the user asked (empty list if none)"],
+  "question_type": "Open | Closed | Leading | None",
+  "behaviours": [{{"behavior": "Name", "impact": "Positive/Negative", "insight": "One sentence", "improved_approach": "Better phrase"}}],
+  "traits": ["Character traits shown (e.g., Curiosity, Defensiveness)"],
+  "missed_question": "A question they should have asked at this point, or empty",
+  "summary": "One sentence on what the user did this turn"
+}}
+
+Be brief. Quote EXACT words only.
+"""
+
+    try:
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import JsonOutputParser
+        parser = JsonOutputParser()
+        prompt_template = PromptTemplate(
+            template="{prompt}\n\n{format_instructions}",
+            input_variables=["prompt"],
+            partial_variables={"format_instructions": parser.get_format_instructions()}
+        )
+
+        chain = prompt_template | llm.get() | parser
+        result = chain.invoke({"prompt": prompt})
+        result["turn"] = turn_number
+        return result
+
+    except Exception as e:
+        print(f" [ERROR] Turn {turn_number} analysis failed: {e}")
+        return None
+
+
+def format_turn_digests(turn_digests):
+    """One compact JSON line per user turn."""
+    return "\n".join(json.dumps(d, separators=(",", ":"), ensure_ascii=False) for d in turn_digests)
+
+
+DIGEST_SYNTHESIS_INSTRUCTION = """
+### INPUT FORMAT
+The conversation below is given as PER-TURN EVIDENCE DIGESTS (one JSON object per user turn) instead of a raw transcript.
+Quotes inside the digests are verbatim - use them as your evidence and cite turns by their "turn" number.
+
+### ADDITIONAL OUTPUT KEYS
+Also include these two keys in the same JSON object:
+"character_assessment": {
+  "observed_traits": [{"trait": "...", "evidence_quote": "EXACT quote", "impact": "Positive/Negative", "insight": "..."}],
+  "scenario_fit": {"required_traits": REQUIRED_TRAITS, "user_strengths": ["..."], "user_gaps": ["..."], "fit_score": "X/10", "fit_assessment": "...", "development_priority": "..."},
+  "character_development_plan": ["Specific behavior change..."]
+},
+"question_analysis": {
+  "questions_asked_count": QUESTIONS_ASKED,
+  "questions_missed": [{"question": "...", "category": "Discovery | Probing | Clarifying | Vision | Closing", "timing": "Early | Mid | Late", "why_important": "...", "when_to_ask": "...", "impact_if_asked": "..."}],
+  "question_quality_score": "X/10",
+  "question_quality_feedback": "...",
+  "questioning_improvement_tip": "..."
+}
+"""
+
+
+def _run_parallel_analysis(chain_raw, system_prompt, full_conversation, transcript, role, ai_role, scenario, scenario_type):
+    """Main report, character and question analysis over the full transcript."""
+    # Invoke Chain - MAIN REPORT (Core scorecard and behavior)
+    print(f" [INFO] Starting PARALLEL report generation (3 LLM calls)...", flush=True)
+    
+    # ===== PARALLEL EXECUTION FOR SPEED =====
+    # Run 3 analysis functions in parallel:
+    # 1. Main report (scorecard, behavior analysis)
+    # 2. Character assessment (NEW)
+    # 3. Question analysis (NEW)
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        # Submit all 3 tasks  
+        future_main = executor.submit(
+            lambda: chain_raw.invoke({
+                "system_prompt": system_prompt,
+                "conversation": full_conversation
+            })
+        )
+        
+        future_character = executor.submit(
+            analyze_character_traits,
+            transcript, role, ai_role, scenario, scenario_type
+        )
+        
+        future_questions = executor.submit(
+            analyze_questions_missed,
+            transcript, role, ai_role, scenario, scenario_type
+        )
+        
+        # Wait for all to complete
+        t1 = dt.datetime.now()
+        raw_response = future_main.result()
+        t2 = dt.datetime.now()
+        print(f" [PERF] Main Report Generation took: {(t2-t1).total_seconds():.2f}s")
+        
+        character_analysis = future_character.result()
+        t3 = dt.datetime.now()
+        print(f" [PERF] Character Analysis took: {(t3-t2).total_seconds():.2f}s (relative to main)")
+        
+        question_analysis = future_questions.result()
+        t4 = dt.datetime.now()
+        print(f" [PERF] Question Analysis took: {(t4-t3).total_seconds():.2f}s (relative to char)")
+    
+    print(f" [SUCCESS] All analyses completed in parallel!", flush=True)
+
+    return raw_response, character_analysis, question_analysis
+
+
+def analyze_full_report_data(transcript, role, ai_role, scenario, framework=None, mode="coaching", scenario_type=None, ai_character="alex", session_mode=None, turn_digests=None):
     """
     Generate report data using SCENARIO-SPECIFIC structures.
+    If turn_digests covers every user turn, a single synthesis call over the
+    digests replaces the three full-transcript calls.
     """
     # Auto-detect scenario type if not provided
     if not scenario_type:
@@ -885,6 +1142,8 @@ def analyze_full_report_data(transcript, role, ai_role, scenario, framework=None
         full_conversation = "\\n".join([f"{'USER' if t['role'] == 'user' else 'ASSISTANT'}: {t['content']}" for t in transcript])
         
         # Setup LangChain Parser
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import JsonOutputParser
         parser = JsonOutputParser()
         
         # Create Prompt Template
@@ -895,51 +1154,33 @@ def analyze_full_report_data(transcript, role, ai_role, scenario, framework=None
         )
         
         # Create Chain WITHOUT parser initially - we'll handle JSON parsing manually
-        chain_raw = prompt | llm
-        
-        # Invoke Chain - MAIN REPORT (Core scorecard and behavior)
-        print(f" [INFO] Starting PARALLEL report generation (3 LLM calls)...", flush=True)
-        
-        # ===== PARALLEL EXECUTION FOR SPEED =====
-        # Run 3 analysis functions in parallel:
-        # 1. Main report (scorecard, behavior analysis)
-        # 2. Character assessment (NEW)
-        # 3. Question analysis (NEW)
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit all 3 tasks  
-            future_main = executor.submit(
-                lambda: chain_raw.invoke({
-                    "system_prompt": system_prompt,
-                    "conversation": full_conversation
-                })
-            )
-            
-            future_character = executor.submit(
-                analyze_character_traits,
-                transcript, role, ai_role, scenario, scenario_type
+        chain_raw = prompt | llm.get()
+        
+        character_analysis = None
+        question_analysis = None
+
+        if turn_digests:
+            # ===== SYNTHESIS FROM PER-TURN DIGESTS =====
+            # Evidence was already extracted turn by turn during the session,
+            # so one small call assembles the whole report.
+            print(f" [INFO] Synthesizing report from {len(turn_digests)} turn digests (1 LLM call)...", flush=True)
+            questions_asked = sum(len(d.get("questions_asked") or []) for d in turn_digests)
+            synthesis_instruction = (
+                DIGEST_SYNTHESIS_INSTRUCTION
+                .replace("REQUIRED_TRAITS", json.dumps(REQUIRED_TRAITS_MAP.get(scenario_type, ["Professional Communication"])))
+                .replace("QUESTIONS_ASKED", str(questions_asked))
             )
-            
-            future_questions = executor.submit(
-                analyze_questions_missed,
-                transcript, role, ai_role, scenario, scenario_type
-            )
-            
-            # Wait for all to complete
             t1 = dt.datetime.now()
-            raw_response = future_main.result()
-            t2 = dt.datetime.now()
-            print(f" [PERF] Main Report Generation took: {(t2-t1).total_seconds():.2f}s")
-            
-            character_analysis = future_character.result()
-            t3 = dt.datetime.now()
-            print(f" [PERF] Character Analysis took: {(t3-t2).total_seconds():.2f}s (relative to main)")
-            
-            question_analysis = future_questions.result()
-            t4 = dt.datetime.now()
-            print(f" [PERF] Question Analysis took: {(t4-t3).total_seconds():.2f}s (relative to char)")
-        
-        print(f" [SUCCESS] All analyses completed in parallel!", flush=True)
+            raw_response = chain_raw.invoke({
+                "system_prompt": system_prompt + synthesis_instruction,
+                "conversation": format_turn_digests(turn_digests)
+            })
+            print(f" [PERF] Digest synthesis took: {(dt.datetime.now()-t1).total_seconds():.2f}s")
+        else:
+            raw_response, character_analysis, question_analysis = _run_parallel_analysis(
+                chain_raw, system_prompt, full_conversation, transcript, role, ai_role, scenario, scenario_type
+            )
+
         
         # === ROBUST JSON PARSING WITH CLEANUP ===
         try:
@@ -1008,7 +1249,40 @@ def analyze_full_report_data(transcript, role, ai_role, scenario, framework=None
         }
 
 
+# FPDF._putfonts builds its subsetter from the fpdf.fpdf module global TTFontFile
+# (PyFPDF 1.7.2 only, see FPDF_REQUIRED_VERSION). DashboardPDF runs the same code
+# with its own copy of those globals, holding the memoised subsetter instead.
+_fpdf_putfonts = types.FunctionType(
+    FPDF._putfonts.__code__, dict(vars(fpdf.fpdf), TTFontFile=CachedTTFontFile),
+    "_putfonts", FPDF._putfonts.__defaults__, FPDF._putfonts.__closure__
+)
+
+
 class DashboardPDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        # Output lines go here instead of the document while not None (see _putTTfontwidths)
+        self._recording = None
+        super().__init__(*args, **kwargs)
+        # Unicode TTF faces by style, or None for core fonts + latin-1 text
+        self.unicode_fonts = report_fonts.get()
+        # (c1, c2, orientation) -> {'i': resource number, 'n': object number} for linear_gradient
+        self.shadings = {}
+
+    def set_font(self, family, style='', size=0):
+        # Arial/Helvetica map onto the Unicode family when it's available
+        if self.unicode_fonts and family.lower() in ('arial', 'helvetica'):
+            style = style.upper()
+            face = ''.join(c for c in 'BI' if c in style)
+            if face not in self.unicode_fonts:
+                face = face.replace('I', '')
+            fontkey = UNICODE_FAMILY + face
+            if fontkey not in self.fonts:
+                # Register on first use so unused faces aren't embedded
+                font = self.unicode_fonts[face]
+                self.fonts[fontkey] = dict(font, i=len(self.fonts) + 1, subset=list(font['subset']))
+            family, style = UNICODE_FAMILY, face + ('U' if 'U' in style else '')
+        super().set_font(family, style, size)
+
     def cell(self, w, h=0, txt='', border=0, ln=0, align='', fill=False, link=''):
         # Auto-sanitize all text going into cells
         txt = sanitize_text(txt) if txt else ''
@@ -1019,7 +1293,10 @@ class DashboardPDF(FPDF):
         txt = sanitize_text(txt) if txt else ''
         # Use provided align, default to Justified if not specified for long text
         super().multi_cell(w, h, txt, border, align, fill)
-    
+
+    def text(self, x, y, txt=''):
+        super().text(x, y, sanitize_text(txt))
+
     def footer(self):
         self.set_y(-15)
         # Add subtle line separator
@@ -1045,21 +1322,75 @@ class DashboardPDF(FPDF):
         return SCENARIO_TITLES.get(stype, SCENARIO_TITLES['custom']).get(section_key, section_key.upper())
 
     def linear_gradient(self, x, y, w, h, c1, c2, orientation='H'):
+        """Fill a rect from c1 to c2 (left to right, or top to bottom with 'V') as a PDF axial shading."""
         self.set_line_width(0)
-        if orientation == 'H':
-            for i in range(int(w)):
-                r = c1[0] + (c2[0] - c1[0]) * (i / w)
-                g = c1[1] + (c2[1] - c1[1]) * (i / w)
-                b = c1[2] + (c2[2] - c1[2]) * (i / w)
-                self.set_fill_color(int(r), int(g), int(b))
-                self.rect(x + i, y, 1, h, 'F')
+        key = (tuple(c1), tuple(c2), orientation)
+        shading = self.shadings.setdefault(key, {'i': len(self.shadings) + 1})
+        # The shading is defined on the unit square; `cm` maps that onto the rect
+        self._out('q %.2f 0 0 %.2f %.2f %.2f cm 0 0 1 1 re W n /Sh%d sh Q' % (
+            w * self.k, h * self.k, x * self.k, (self.h - y - h) * self.k, shading['i']))
+
+    # --- PyFPDF 1.7.2 internals (FPDF_REQUIRED_VERSION) ---
+    # All of the report's additions to the PDF output live here, one override
+    # per fpdf method, each calling it exactly once. _putresources is the only
+    # place extra objects are written and _putresourcedict the only place they
+    # are listed; fonts and images stay with fpdf.
+
+    def _putresources(self):
+        self._put_shadings()
+        super()._putresources()  # fonts (via _putfonts below), images, then the resource dict
+
+    def _putresourcedict(self):
+        super()._putresourcedict()
+        for category, entries in self._extra_resources().items():
+            if entries:
+                self._out('/%s <<' % category)
+                for name, obj in entries:
+                    self._out('/%s %d 0 R' % (name, obj))
+                self._out('>>')
+
+    def _extra_resources(self):
+        """{resource category: [(name, object number)]} written by _putresources."""
+        return {'Shading': [('Sh%d' % s['i'], s['n']) for s in self.shadings.values()]}
+
+    def _put_shadings(self):
+        # One shading object per gradient, shared by every page that draws it
+        for (c1, c2, orientation), shading in self.shadings.items():
+            self._newobj()
+            shading['n'] = self.n
+            coords = '0 0 1 0' if orientation == 'H' else '0 1 0 0'
+            self._out('<</ShadingType 2 /ColorSpace /DeviceRGB /Coords [%s] /Extend [true true]' % coords)
+            self._out('/Function <</FunctionType 2 /Domain [0 1] /C0 [%.3f %.3f %.3f] /C1 [%.3f %.3f %.3f] /N 1>>>>' % (
+                *(c / 255 for c in c1), *(c / 255 for c in c2)))
+            self._out('endobj')
+
+    def _putfonts(self):
+        # Round TTF subsets up to whole 32-codepoint blocks so that reports
+        # in the same scripts share one cached subset. fpdf drops the first entry.
+        for font in self.fonts.values():
+            if font['type'] == 'TTF':
+                blocks = sorted({c >> 5 for c in font['subset']})
+                font['subset'] = [0] + [b * 32 + i for b in blocks for i in range(32)]
+        _fpdf_putfonts(self)
+
+    def _putTTfontwidths(self, font, maxUni):
+        # fpdf scans every codepoint against the subset *list*; do it once per glyph set, against a set
+        def build():
+            self._recording = []
+            try:
+                super(DashboardPDF, self)._putTTfontwidths(dict(font, subset=set(font['subset'])), maxUni)
+                return self._recording
+            finally:
+                self._recording = None
+
+        for line in _font_cached(("widths", font['ttffile'], frozenset(font['subset']), maxUni), build):
+            self._out(line)
+
+    def _out(self, s):
+        if self._recording is not None:
+            self._recording.append(s)
         else:
-            for i in range(int(h)):
-                r = c1[0] + (c2[0] - c1[0]) * (i / h)
-                g = c1[1] + (c2[1] - c1[1]) * (i / h)
-                b = c1[2] + (c2[2] - c1[2]) * (i / h)
-                self.set_fill_color(int(r), int(g), int(b))
-                self.rect(x, y + i, w, 1, 'F')
+            super()._out(s)
 
     def set_user_name(self, name):
         self.user_name = sanitize_text(name)
@@ -1979,8 +2310,32 @@ class DashboardPDF(FPDF):
                 
                 self.ln(3) # Extra spacing after alts
 
+    def _path(self, points, style='D'):
+        """Closed straight-line path through (x, y) points. style: 'D' stroke, 'F' fill, 'DF' both."""
+        op = {'F': 'f', 'DF': 'B', 'FD': 'B'}.get(style, 'S')
+        k, h = self.k, self.h
+        ops = ['%.2F %.2F m' % (points[0][0] * k, (h - points[0][1]) * k)]
+        ops += ['%.2F %.2F l' % (x * k, (h - y) * k) for x, y in points[1:]]
+        self._out(' '.join(ops) + ' h ' + op)
+
+    def _dot(self, x, y, r):
+        """Filled circle (four Bezier arcs)."""
+        k, h = self.k, self.h
+        c = r * 0.5523  # control point offset for a quarter circle
+        pts = [
+            (x + r, y),
+            (x + r, y - c, x + c, y - r, x, y - r),
+            (x - c, y - r, x - r, y - c, x - r, y),
+            (x - r, y + c, x - c, y + r, x, y + r),
+            (x + c, y + r, x + r, y + c, x + r, y),
+        ]
+        ops = ['%.2F %.2F m' % (pts[0][0] * k, (h - pts[0][1]) * k)]
+        for x1, y1, x2, y2, x3, y3 in pts[1:]:
+            ops.append('%.2F %.2F %.2F %.2F %.2F %.2F c' % (x1 * k, (h - y1) * k, x2 * k, (h - y2) * k, x3 * k, (h - y3) * k))
+        self._out(' '.join(ops) + ' f')
+
     def draw_radar_chart(self, scorecard):
-        """Draw a radar chart for the scorecard dimensions."""
+        """Draw a radar chart for the scorecard dimensions (vector paths, 0-10 scale)."""
         if not scorecard: return
 
         # Extract data
@@ -1996,52 +2351,66 @@ class DashboardPDF(FPDF):
                 val = 0.0
             
             labels.append(dim)
-            scores.append(val)
+            scores.append(min(max(val, 0.0), 10.0))
 
         if not labels: return
 
-        # Number of variables
-        N = len(labels)
-        
-        # Compute angle for each axis
-        angles = [n / float(N) * 2 * np.pi for n in range(N)]
-        angles += angles[:1] # Close the loop
-        
-        scores += scores[:1] # Close the loop
-        
-        # Plot
-        fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-        
-        # Draw one axe per variable + add labels
-        plt.xticks(angles[:-1], labels, color='grey', size=8)
-        
-        # Draw ylabels
-        ax.set_rlabel_position(0)
-        plt.yticks([2,4,6,8,10], ["2","4","6","8","10"], color="grey", size=7)
-        plt.ylim(0, 10)
-        
-        # Plot data
-        ax.plot(angles, scores, linewidth=2, linestyle='solid', color='#3b82f6') # Blue 500
-        ax.fill(angles, scores, '#3b82f6', alpha=0.2)
-        
-        # Save to temp file
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            plt.savefig(tmp.name, bbox_inches='tight', transparent=True)
-            tmp_path = tmp.name
-        
-        plt.close(fig)
-        
-        # Embed in PDF
-        # Center the chart
         self.check_space(90)
-        self.image(tmp_path, x=60, y=self.get_y(), w=90)
+        top = self.get_y()
+        cx, cy, radius = self.w / 2, top + 45, 32
+
+        # One axis per dimension, clockwise from 12 o'clock
+        N = len(labels)
+        angles = [-math.pi / 2 + 2 * math.pi * i / N for i in range(N)]
+
+        def point(angle, value):
+            return (cx + radius * value / 10 * math.cos(angle), cy + radius * value / 10 * math.sin(angle))
+
+        # Grid rings and axes
+        self.set_line_width(0.2)
+        self.set_draw_color(226, 232, 240)  # Slate 200
+        for ring in (2, 4, 6, 8, 10):
+            self._path([point(a, ring) for a in angles])
+        for a in angles:
+            x, y = point(a, 10)
+            self.line(cx, cy, x, y)
+
+        # Scores: Blue 100 fill (the old 20% Blue 500 over white), Blue 500 outline
+        shape = [point(a, v) for a, v in zip(angles, scores)]
+        self.set_fill_color(219, 234, 254)
+        self.set_draw_color(*COLORS['accent'])
+        self.set_line_width(0.6)
+        self._path(shape, 'DF')
+        self.set_fill_color(*COLORS['accent'])
+        for x, y in shape:
+            self._dot(x, y, 0.9)
+        self.set_line_width(0.2)
+
+        # Ring values along the first axis (over the fill)
+        self.set_font('Arial', '', 6)
+        self.set_text_color(*COLORS['text_light'])
+        for ring in (2, 4, 6, 8, 10):
+            x, y = point(angles[0], ring)
+            self.text(x + 1, y + 1, str(ring))
+
+        # Dimension labels just outside the outer ring, aligned away from the centre
+        self.set_font('Arial', '', 7)
+        self.set_text_color(*COLORS['text_main'])
+        for a, label, value in zip(angles, labels, scores):
+            text = f"{label[:28]} ({value:g})"
+            tw = self.get_string_width(text)
+            x = cx + (radius + 4) * math.cos(a)
+            y = cy + (radius + 4) * math.sin(a)
+            if math.cos(a) > 0.3:
+                tx = x
+            elif math.cos(a) < -0.3:
+                tx = x - tw
+            else:
+                tx = x - tw / 2
+            self.text(tx, y + 1.2, text)
+
+        self.set_y(top)
         self.ln(90)
-        
-        # Cleanup
-        try:
-            os.remove(tmp_path)
-        except:
-            pass
 
 
     def draw_key_value_grid(self, title, data_dict, color=COLORS['secondary']):
@@ -2285,10 +2654,13 @@ class DashboardPDF(FPDF):
             self.draw_list_section("TRY NEXT", guidance.get('try_next', []), COLORS['accent'])
 
 
-def generate_report(transcript, role, ai_role, scenario, framework=None, filename="coaching_report.pdf", mode="coaching", precomputed_data=None, scenario_type=None, user_name="Valued User", ai_character="alex"):
-    """
-    Generate a UNIFIED PDF report for all scenario types.
-    """
+def render_report_bytes(transcript, role, ai_role, scenario, framework=None, mode="coaching", precomputed_data=None, scenario_type=None, user_name="Valued User", ai_character="alex"):
+    """The unified PDF report for all scenario types, as bytes."""
+    pdf, _ = build_report_pdf(transcript, role, ai_role, scenario, framework, mode, precomputed_data, scenario_type, user_name, ai_character)
+    return pdf.output(dest='S').encode('latin-1')
+
+def build_report_pdf(transcript, role, ai_role, scenario, framework=None, mode="coaching", precomputed_data=None, scenario_type=None, user_name="Valued User", ai_character="alex"):
+    """Lay out the report. Returns (DashboardPDF, scenario_type)."""
     # Auto-detect scenario type if not provided
     if not scenario_type:
         scenario_type = detect_scenario_type(scenario, ai_role, role)
@@ -2314,7 +2686,9 @@ def generate_report(transcript, role, ai_role, scenario, framework=None, filenam
             return [sanitize_data_recursive(item) for item in obj]
         return obj
     
-    data = sanitize_data_recursive(data)
+    # cell()/multi_cell()/text() clean their own text; the core-font path keeps its up-front pass
+    if not report_fonts.get():
+        data = sanitize_data_recursive(data)
     
     pdf = DashboardPDF()
     pdf.set_scenario_type(scenario_type)
@@ -2381,6 +2755,4 @@ def generate_report(transcript, role, ai_role, scenario, framework=None, filenam
         # Fallback to generic dump if drawing fails
         pdf.draw_key_value_grid("RAW DATA DUMP (Drawing Failed)", {k:str(v)[:100] for k,v in data.items() if k != 'meta'})
 
-    
-    pdf.output(filename)
-    print(f"[SUCCESS] Unified report saved: {filename} (scenario: {scenario_type})")
+    return pdf, scenario_type
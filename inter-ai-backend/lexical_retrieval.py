@@ -0,0 +1,133 @@
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------
+# Lexical (BM25) Question Retrieval
+# ---------------------------------------------------------
+# Pure-CPU retrieval over framework_questions.json - no embeddings, no
+# network. Postings hold precomputed BM25 weights per (term, question), so a
+# query is a handful of vectorised adds into a score array. Framework and
+# (framework, stage) candidate masks are precomputed for filtering.
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "could", "did", "do", "does", "for",
+    "from", "had", "has", "have", "how", "i", "if", "in", "into", "is", "it", "its", "me", "my", "of",
+    "on", "or", "so", "that", "the", "their", "them", "then", "there", "these", "they", "this", "to",
+    "was", "we", "were", "what", "when", "where", "which", "who", "why", "will", "with", "would",
+    "you", "your",
+}
+
+
+def _stem(token: str) -> str:
+    # Light suffix stripping - enough to match goal/goals, feel/feeling, plan/planned
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """BM25 over a fixed list of questions, scored with NumPy."""
+
+    def __init__(self, questions: List[Dict], k1: float = BM25_K1, b: float = BM25_B):
+        self.questions = questions
+        self.size = len(questions)
+
+        docs = [tokenize(q.get("question", "")) for q in questions]
+        lengths = np.array([len(d) for d in docs], dtype="float32")
+        avg_len = float(lengths.mean()) if self.size else 0.0
+
+        term_freqs: Dict[str, Dict[int, int]] = {}
+        for doc_id, tokens in enumerate(docs):
+            for token in tokens:
+                counts = term_freqs.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        # term -> (doc ids, BM25 weight of the term in each doc)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, counts in term_freqs.items():
+            ids = np.fromiter(counts.keys(), dtype="int32", count=len(counts))
+            tf = np.fromiter(counts.values(), dtype="float32", count=len(counts))
+            idf = math.log(1 + (self.size - len(counts) + 0.5) / (len(counts) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / (avg_len or 1))
+            self.postings[term] = (ids, (idf * tf * (k1 + 1) / (tf + norm)).astype("float32"))
+
+        # Candidate masks per framework and per (framework, stage)
+        self.framework_masks: Dict[str, np.ndarray] = {}
+        self.stage_masks: Dict[Tuple[str, str], np.ndarray] = {}
+        for doc_id, q in enumerate(questions):
+            fw = (q.get("framework") or "").upper()
+            stage = (q.get("stage") or "").upper()
+            self.framework_masks.setdefault(fw, np.zeros(self.size, dtype=bool))[doc_id] = True
+            self.stage_masks.setdefault((fw, stage), np.zeros(self.size, dtype=bool))[doc_id] = True
+
+    def _mask(self, frameworks: Iterable[str], stage: Optional[str]) -> Optional[np.ndarray]:
+        frameworks = [fw.upper() for fw in frameworks]
+        if not frameworks:
+            return None
+        mask = np.zeros(self.size, dtype=bool)
+        for fw in frameworks:
+            part = self.stage_masks.get((fw, stage.upper())) if stage else self.framework_masks.get(fw)
+            if part is not None:
+                mask |= part
+        return mask
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype="float32")
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                ids, weights = posting
+                scores[ids] += weights
+        return scores
+
+    def search(self, query: str, frameworks: Iterable[str] = (), top_k: int = 5,
+               stage: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(question index, score) pairs, best first, within the given frameworks.
+
+        Only questions sharing a term with the query are returned - an empty
+        list means nothing matched, not "any question will do".
+        """
+        if not self.size:
+            return []
+        scores = self.scores(query)
+        mask = self._mask(frameworks, stage)
+        if mask is not None:
+            candidates = np.flatnonzero(mask)
+        else:
+            candidates = np.arange(self.size)
+        if not len(candidates):
+            return []
+
+        # Unmatched questions all score 0; ranking them would just be file order
+        candidates = candidates[scores[candidates] > 0]
+        if not len(candidates):
+            return []
+
+        candidate_scores = scores[candidates]
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        # Best score first; ties keep file order (stage order within a framework)
+        top = top[np.lexsort((candidates[top], -candidate_scores[top]))]
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], top_k: int, k: int = 60) -> List[str]:
+    """Fuse several best-first rankings of the same items into one."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda item: -fused[item])[:top_k]
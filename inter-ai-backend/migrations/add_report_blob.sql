@@ -0,0 +1,15 @@
+-- Migration: Store the report blob name instead of an expiring link
+-- Author: CoAct.AI
+-- Date: 2026-10-17
+-- Purpose: Sessions kept a 24-hour SAS URL to their report, so old reports
+--          became unreachable. The backend now stores the blob name and signs
+--          a fresh read-only URL whenever the report is opened.
+
+-- Step 1: Add report_blob (NULL for reports rendered before this migration)
+ALTER TABLE practice_history
+ADD COLUMN IF NOT EXISTS report_blob TEXT;
+
+-- Verify migration
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'practice_history' AND column_name = 'report_blob';
@@ -0,0 +1,16 @@
+-- Migration: Remember which report was last rendered for a session
+-- Author: CoAct.AI
+-- Date: 2026-10-17
+-- Purpose: /complete re-runs and retries re-rendered and re-uploaded an
+--          unchanged PDF. The backend now stores a hash of the render inputs
+--          and the template version, and reuses the existing PDF when they match.
+
+-- Step 1: Add report hash and template version (NULL = never rendered, always re-render)
+ALTER TABLE practice_history
+ADD COLUMN IF NOT EXISTS report_hash TEXT,
+ADD COLUMN IF NOT EXISTS report_template TEXT;
+
+-- Verify migration: should return 2 rows
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'practice_history' AND column_name IN ('report_hash', 'report_template');
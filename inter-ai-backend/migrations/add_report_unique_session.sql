@@ -0,0 +1,28 @@
+-- Migration: One report row per session (enables INSERT ... ON CONFLICT upserts)
+-- Author: CoAct.AI
+-- Date: 2026-10-17
+-- Purpose: Report metrics used delete + insert + commit per table; the backend now
+--          upserts them in the same transaction as the session, keyed on session_id
+
+-- Step 1: Remove duplicates, keeping the newest row per session
+DELETE FROM coaching_reports a
+USING coaching_reports b
+WHERE a.session_id = b.session_id AND a.id < b.id;
+
+DELETE FROM assessment_reports a
+USING assessment_reports b
+WHERE a.session_id = b.session_id AND a.id < b.id;
+
+DELETE FROM learning_plans a
+USING learning_plans b
+WHERE a.session_id = b.session_id AND a.id < b.id;
+
+-- Step 2: Unique indexes used as ON CONFLICT targets
+CREATE UNIQUE INDEX IF NOT EXISTS coaching_reports_session_id_key ON coaching_reports(session_id);
+CREATE UNIQUE INDEX IF NOT EXISTS assessment_reports_session_id_key ON assessment_reports(session_id);
+CREATE UNIQUE INDEX IF NOT EXISTS learning_plans_session_id_key ON learning_plans(session_id);
+
+-- Verify migration: should return 3 rows
+SELECT tablename, indexname
+FROM pg_indexes
+WHERE indexname IN ('coaching_reports_session_id_key', 'assessment_reports_session_id_key', 'learning_plans_session_id_key');
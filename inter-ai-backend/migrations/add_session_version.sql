@@ -0,0 +1,15 @@
+-- Migration: Optimistic concurrency for practice sessions
+-- Author: CoAct.AI
+-- Date: 2026-10-17
+-- Purpose: Writes used to overwrite the session unconditionally, so a worker
+--          holding a stale copy could clobber a newer transcript. Each write
+--          now bumps version and only applies if version is unchanged.
+
+-- Step 1: Add version column (existing rows start at 0)
+ALTER TABLE practice_history
+ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+-- Verify migration
+SELECT column_name, data_type, column_default
+FROM information_schema.columns
+WHERE table_name = 'practice_history' AND column_name = 'version';
@@ -0,0 +1,16 @@
+-- Migration: Keep per-turn analysis digests with the session
+-- Author: CoAct.AI
+-- Date: 2026-10-17
+-- Purpose: Each user turn is analysed in the background while the session
+--          runs, and the report is synthesized from those digests. They were
+--          held in one backend process only, so a restart or another worker
+--          lost them and the report fell back to the full analysis.
+
+-- Step 1: Add turn_digests ({"<user turn>": digest}, NULL until the first one)
+ALTER TABLE practice_history
+ADD COLUMN IF NOT EXISTS turn_digests JSONB;
+
+-- Verify migration
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'practice_history' AND column_name = 'turn_digests';
@@ -0,0 +1,40 @@
+-- Migration: Append-only turn storage for practice sessions
+-- Author: CoAct.AI
+-- Date: 2026-10-17
+-- Purpose: Store each chat message as its own row instead of rewriting the
+--          whole practice_history.transcript JSONB on every turn
+
+-- Step 1: Create practice_turns table
+CREATE TABLE IF NOT EXISTS practice_turns (
+    session_id VARCHAR(50) NOT NULL REFERENCES practice_history(session_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,              -- 0-based position in the transcript
+    role VARCHAR(20) NOT NULL,         -- user, assistant
+    content TEXT NOT NULL,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (session_id, seq)
+);
+
+-- Step 2: Backfill from existing transcripts (safe to re-run)
+-- Keys other than role/content (e.g. audio_url) go to metadata, as the app writes them
+INSERT INTO practice_turns (session_id, seq, role, content, metadata, created_at)
+SELECT ph.session_id,
+       t.ord - 1,
+       COALESCE(t.turn->>'role', 'user'),
+       COALESCE(t.turn->>'content', ''),
+       NULLIF(t.turn - 'role' - 'content', '{}'::jsonb),
+       ph.created_at
+FROM practice_history ph
+CROSS JOIN LATERAL jsonb_array_elements(COALESCE(ph.transcript, '[]'::jsonb)) WITH ORDINALITY AS t(turn, ord)
+ON CONFLICT (session_id, seq) DO NOTHING;
+
+-- Step 3 (optional, after verifying): reclaim space from the legacy column
+-- The app reads turns first and only falls back to transcript for sessions without rows.
+-- UPDATE practice_history ph SET transcript = '[]'::jsonb
+-- WHERE EXISTS (SELECT 1 FROM practice_turns pt WHERE pt.session_id = ph.session_id);
+
+-- Verify migration: every session's turn count should match its transcript length
+SELECT COUNT(*) AS mismatched_sessions
+FROM practice_history ph
+WHERE jsonb_array_length(COALESCE(ph.transcript, '[]'::jsonb)) <>
+      (SELECT COUNT(*) FROM practice_turns pt WHERE pt.session_id = ph.session_id);
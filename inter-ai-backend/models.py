@@ -5,7 +5,8 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from flask_bcrypt import Bcrypt
 import uuid
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, func, null, tuple_
+from sqlalchemy.orm import joinedload, load_only
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -36,11 +37,48 @@ class PracticeHistory(db.Model):
     report_data = db.Column(JSONB)
     behaviour_analysis = db.Column(JSONB) # Dedicated column for analysis
     completed = db.Column(db.Boolean, default=False)
+    # Bumped on every write; a write from a stale copy of the session is rejected
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Hash of the last rendered report's inputs and its template version (see report_cache.py)
+    report_hash = db.Column(db.String(64))
+    report_template = db.Column(db.String(32))
+    # Blob holding the report PDF; SAS links are signed from it on demand
+    report_blob = db.Column(db.Text)
+    # Per-user-turn analysis digests, {"<turn>": digest} (see turn_analysis.py)
+    turn_digests = db.Column(JSONB)
 
 
     assessment_report = db.relationship("AssessmentReport", backref="session", uselist=False, cascade="all, delete-orphan")
     learning_plan = db.relationship("LearningPlan", backref="session", uselist=False, cascade="all, delete-orphan")
     coaching_report = db.relationship("CoachingReport", backref="session", uselist=False, cascade="all, delete-orphan")
+    # Loaded on first access only (see get_transcript)
+    turns = db.relationship("PracticeTurn", order_by="PracticeTurn.seq", lazy="select", cascade="all, delete-orphan")
+
+    def get_transcript(self):
+        """Transcript from practice_turns; legacy JSONB column for sessions not yet migrated."""
+        if self.turns:
+            return [turn.to_dict() for turn in self.turns]
+        return self.transcript or []
+
+    def to_summary_dict(self):
+        """History list entry - no transcript or report payloads."""
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "scenario": self.scenario,
+            "title": self.title,
+            "date": self.created_at.isoformat() if self.created_at else None,
+            "scenario_type": self.scenario_type,
+            "role": self.role,
+            "ai_role": self.ai_role,
+            "score": self.score,
+            "completed": self.completed,
+            "reports": {
+                "coaching": self.coaching_report.to_dict() if self.coaching_report else None,
+                "assessment": self.assessment_report.to_dict() if self.assessment_report else None,
+                "learning": self.learning_plan.to_dict() if self.learning_plan else None
+            }
+        }
 
     def to_dict(self):
         return {
@@ -53,10 +91,15 @@ class PracticeHistory(db.Model):
 
             "role": self.role,
             "ai_role": self.ai_role,
-            "transcript": self.transcript,
+            "transcript": self.get_transcript(),
             "report_data": self.report_data,
             "behaviour_analysis": self.behaviour_analysis,
             "completed": self.completed,
+            "version": self.version,
+            "report_hash": self.report_hash,
+            "report_template": self.report_template,
+            "report_blob": self.report_blob,
+            "turn_digests": self.turn_digests or {},
             "reports": {
                 "coaching": self.coaching_report.to_dict() if self.coaching_report else None,
                 "assessment": self.assessment_report.to_dict() if self.assessment_report else None,
@@ -64,11 +107,26 @@ class PracticeHistory(db.Model):
             }
         }
 
+class PracticeTurn(db.Model):
+    """One transcript message. Turns are only ever appended."""
+    __tablename__ = 'practice_turns'
+
+    session_id = Column(String(50), ForeignKey('practice_history.session_id', ondelete='CASCADE'), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # 0-based position in the transcript
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    turn_metadata = Column("metadata", JSONB)  # every key besides role/content, e.g. audio_url ("metadata" is reserved on declarative models)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        # Same shape as the in-memory transcript entry it was written from
+        return {"role": self.role, "content": self.content, **(self.turn_metadata or {})}
+
 class CoachingReport(db.Model):
     __tablename__ = 'coaching_reports'
     
     id = Column(Integer, primary_key=True)
-    session_id = Column(String(50), ForeignKey('practice_history.session_id'), nullable=False)
+    session_id = Column(String(50), ForeignKey('practice_history.session_id'), nullable=False, unique=True)  # one row per session (upserted)
     user_id = Column(UUID(as_uuid=True), nullable=False)  # Added to match database
     overall_score = Column(Float)
     empathy_score = Column(Float)
@@ -86,7 +144,7 @@ class AssessmentReport(db.Model):
     __tablename__ = 'assessment_reports'
     
     id = Column(Integer, primary_key=True)
-    session_id = Column(String(50), ForeignKey('practice_history.session_id'), nullable=False)
+    session_id = Column(String(50), ForeignKey('practice_history.session_id'), nullable=False, unique=True)  # one row per session (upserted)
     scenario_name = Column(String(255))  # NEW: Scenario title for display
     rapport_building_score = Column(Float)
     value_articulation_score = Column(Float)
@@ -105,7 +163,7 @@ class LearningPlan(db.Model):
     __tablename__ = 'learning_plans'
     
     id = Column(Integer, primary_key=True)
-    session_id = Column(String(50), ForeignKey('practice_history.session_id'), nullable=False)
+    session_id = Column(String(50), ForeignKey('practice_history.session_id'), nullable=False, unique=True)  # one row per session (upserted)
     user_id = Column(UUID(as_uuid=True), nullable=False)
     skill_focus_areas = Column(Text)
     practice_suggestions = Column(Text)
@@ -130,9 +188,33 @@ def init_db(app):
 def get_user_by_email(email):
     return User.query.filter_by(email=email).first()
 
-def get_user_history(user_id):
-    """Get all practice sessions for a specific user, ordered by date."""
-    return PracticeHistory.query.filter_by(user_id=user_id).order_by(PracticeHistory.created_at.desc()).all()
+def get_user_history_page(user_id, limit=None, before=None):
+    """Summary rows for a user's history, newest first, in a single query.
+
+    `before` is a (created_at, session_id) cursor from the last row of the
+    previous page; ties on created_at are broken by session_id.
+    """
+    query = (
+        PracticeHistory.query
+        .options(
+            load_only(
+                PracticeHistory.session_id, PracticeHistory.user_id, PracticeHistory.scenario,
+                PracticeHistory.title, PracticeHistory.created_at, PracticeHistory.scenario_type,
+                PracticeHistory.role, PracticeHistory.ai_role, PracticeHistory.score, PracticeHistory.completed
+            ),
+            # One LEFT JOIN per report table instead of three lazy loads per row
+            joinedload(PracticeHistory.coaching_report),
+            joinedload(PracticeHistory.assessment_report),
+            joinedload(PracticeHistory.learning_plan),
+        )
+        .filter(PracticeHistory.user_id == (user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))))
+    )
+    if before:
+        query = query.filter(tuple_(PracticeHistory.created_at, PracticeHistory.session_id) < tuple_(*before))
+    query = query.order_by(PracticeHistory.created_at.desc(), PracticeHistory.session_id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
 def get_session_by_id(session_id):
     return PracticeHistory.query.get(session_id)
@@ -158,79 +240,156 @@ def create_user(data):
     db.session.commit()
     return new_user, None
 
-def create_session(session_id, data, user_id=None):
-    """Create a new session record."""
-    new_session = PracticeHistory(
-        session_id=session_id,
-        user_id=user_id, # Link to logged-in user
+class StaleSessionError(Exception):
+    """The session was written elsewhere since the expected version was read."""
+
+def _insert(model):
+    """Dialect-specific INSERT that supports ON CONFLICT (Postgres in prod, SQLite locally)."""
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model.__table__)
+
+def append_turns(session_id, turns, start_seq=None, commit=True):
+    """Append transcript messages to practice_turns.
 
-        scenario=data.get("scenario"), # Renamed from scenario_id
-        scenario_type=data.get("scenario_type", "custom"),
+    With start_seq=None only messages past the last stored seq are written,
+    so passing the full transcript is cheap and idempotent. Rows that already
+    exist are left alone.
+    """
+    if start_seq is None:
+        last_seq = db.session.query(func.max(PracticeTurn.seq)).filter_by(session_id=session_id).scalar()
+        start_seq = 0 if last_seq is None else last_seq + 1
+        turns = turns[start_seq:]
+
+    if turns:
+        rows = [{
+            "session_id": session_id,
+            "seq": start_seq + offset,
+            "role": turn.get("role", "user"),
+            "content": turn.get("content") or "",
+            "metadata": {k: v for k, v in turn.items() if k not in ("role", "content")} or None,
+        } for offset, turn in enumerate(turns)]
+        db.session.execute(_insert(PracticeTurn).on_conflict_do_nothing(index_elements=["session_id", "seq"]), rows)
+    if commit:
+        db.session.commit()
+    return start_seq + len(turns)
+
+def upsert_session(session_id, data, user_id=None, include_report=False, expected_version=None):
+    """INSERT ... ON CONFLICT for the practice_history row (no commit). Returns the new version.
+
+    Chat turns only bump the version and store turn digests;
+    include_report=True also overwrites report_data, behaviour_analysis,
+    completed and the report hash/blob.
+    With expected_version, raises StaleSessionError if the stored row has
+    moved past it.
+    """
+    table = PracticeHistory.__table__
+    report_data = data.get("report_data") or {}
+    stmt = _insert(PracticeHistory).values(
+        session_id=session_id,
+        user_id=user_id,
+        scenario=data.get("scenario"),
+        scenario_type=data.get("scenario_type") or "custom",
         role=data.get("role"),
         ai_role=data.get("ai_role"),
-        title=data.get("title"), # Store title
-        transcript=data.get("transcript", []),
-        report_data={},
-        behaviour_analysis=data.get("behaviour_analysis", []),
-        completed=False
+        title=data.get("title"),
+        transcript=[],  # Messages live in practice_turns
+        report_data=report_data,
+        behaviour_analysis=report_data.get("behaviour_analysis", []),
+        completed=bool(data.get("completed")),
+        report_hash=data.get("report_hash"),
+        report_template=data.get("report_template"),
+        report_blob=data.get("report_blob"),
+        turn_digests=data.get("turn_digests") or null(),
+        version=0,
+        created_at=datetime.utcnow()
     )
-    db.session.add(new_session)
-    db.session.commit()
-    return new_session
-
-def update_session(session_id, data):
-    """Update an existing session with new transcript/status."""
-    session = PracticeHistory.query.get(session_id)
-    if session:
-        if "transcript" in data:
-            session.transcript = data["transcript"]
-        if "report_data" in data:
-            session.report_data = data["report_data"]
-        if "behaviour_analysis" in data:
-            session.behaviour_analysis = data["behaviour_analysis"]
-        if "status" in data:
-            session.completed = (data["status"] == "completed")
-        
-        db.session.commit()
+    # Digests only accumulate; a copy without any never clears the stored ones
+    updates = {"version": table.c.version + 1, "turn_digests": func.coalesce(stmt.excluded.turn_digests, table.c.turn_digests)}
+    if include_report:
+        updates.update({
+            "report_data": stmt.excluded.report_data,
+            "behaviour_analysis": stmt.excluded.behaviour_analysis,
+            "completed": stmt.excluded.completed,
+            "report_hash": stmt.excluded.report_hash,
+            "report_template": stmt.excluded.report_template,
+            "report_blob": stmt.excluded.report_blob,
+            # Never drop an owner we already have
+            "user_id": func.coalesce(table.c.user_id, stmt.excluded.user_id),
+        })
+    where = table.c.version == expected_version if expected_version is not None else None
+    stmt = stmt.on_conflict_do_update(index_elements=["session_id"], set_=updates, where=where)
+    version = db.session.execute(stmt.returning(table.c.version)).scalar()
+    if version is None:
+        raise StaleSessionError(f"Session {session_id} changed since version {expected_version}")
+    return version
+
+def upsert_report_metrics(session_id, report_type, metrics, user_id=None):
+    """INSERT ... ON CONFLICT for the report table matching report_type (no commit)."""
+    if report_type == "coaching":
+        model, values = CoachingReport, {
+            "user_id": user_id,
+            "overall_score": metrics.get("overall_score"),
+            "empathy_score": metrics.get("empathy_score"),
+            "psych_safety_score": metrics.get("psych_safety_score"),
+        }
+    elif report_type == "sales" or report_type == "assessment":
+        model, values = AssessmentReport, {
+            "scenario_name": metrics.get("scenario_name", "Assessment"),
+            "rapport_building_score": metrics.get("rapport_building_score"),
+            "value_articulation_score": metrics.get("value_articulation_score"),
+            "objection_handling_score": metrics.get("objection_handling_score"),
+        }
+    elif report_type == "learning":
+        model, values = LearningPlan, {
+            "user_id": user_id,
+            "skill_focus_areas": json.dumps(metrics.get("skill_focus_areas", [])),
+            "practice_suggestions": json.dumps(metrics.get("practice_suggestions", [])),
+        }
+    else:
+        return False
+
+    if "user_id" in values and not user_id:
+        # Completion requests may not carry the owner; use the one stored on the session
+        user_id = db.session.query(PracticeHistory.user_id).filter_by(session_id=session_id).scalar()
+        values["user_id"] = user_id
+    if "user_id" in values and not user_id:
+        print(f" [WARNING] Skipping {report_type} report metrics for guest session {session_id}")
+        return False
+
+    stmt = _insert(model).values(session_id=session_id, created_at=datetime.utcnow(), **values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=["session_id"], set_=values))
+    return True
+
+def persist_session(session_id, data, user_id=None, known_turns=None, report_type=None, metrics=None,
+                    expected_version=None):
+    """Write session row, new turns and (optionally) report metrics in one transaction.
 
-def save_report_metrics(session_id, report_type, metrics, user_id=None):
-    """Save specific report metrics to corresponding tables."""
+    known_turns is how many transcript messages are already stored, if the
+    caller knows; otherwise it is looked up. Commits exactly once and returns
+    the session's new version; raises StaleSessionError (nothing written) if
+    expected_version is out of date.
+    """
+    include_report = bool(data.get("completed") or data.get("report_data"))
     try:
-        if report_type == "coaching":
-            # Delete existing if any (simplest update strategy)
-            CoachingReport.query.filter_by(session_id=session_id).delete()
-            report = CoachingReport(
-                session_id=session_id,
-                user_id=user_id,
-                overall_score=metrics.get("overall_score"),
-                empathy_score=metrics.get("empathy_score"),
-                psych_safety_score=metrics.get("psych_safety_score")
-            )
-            db.session.add(report)
-            
-        elif report_type == "sales" or report_type == "assessment":
-            AssessmentReport.query.filter_by(session_id=session_id).delete()
-            report = AssessmentReport(
-                session_id=session_id,
-                scenario_name=metrics.get("scenario_name", "Assessment"),
-                rapport_building_score=metrics.get("rapport_building_score"),
-                value_articulation_score=metrics.get("value_articulation_score"),
-                objection_handling_score=metrics.get("objection_handling_score")
-            )
-            db.session.add(report)
-            
-        elif report_type == "learning":
-            LearningPlan.query.filter_by(session_id=session_id).delete()
-            report = LearningPlan(
-                session_id=session_id,
-                user_id=user_id,
-                skill_focus_areas=json.dumps(metrics.get("skill_focus_areas", [])),
-                practice_suggestions=json.dumps(metrics.get("practice_suggestions", []))
-            )
-            db.session.add(report)
-            
+        version = upsert_session(session_id, data, user_id=user_id, include_report=include_report,
+                                 expected_version=expected_version)
+        transcript = data.get("transcript", [])
+        if known_turns is None:
+            append_turns(session_id, transcript, commit=False)
+        else:
+            append_turns(session_id, transcript[known_turns:], start_seq=known_turns, commit=False)
+        if report_type and metrics is not None:
+            try:
+                # A bad metrics row must not lose the report itself
+                with db.session.begin_nested():
+                    upsert_report_metrics(session_id, report_type, metrics, user_id=user_id)
+            except Exception as e:
+                print(f" [ERROR] Error saving report metrics: {e}")
         db.session.commit()
-        print(f" [SUCCESS] Saved {report_type} report metrics for session {session_id}")
-    except Exception as e:
-        print(f" [ERROR] Error saving report metrics: {e}")
+        return version
+    except Exception:
         db.session.rollback()
+        raise
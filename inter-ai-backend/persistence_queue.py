@@ -0,0 +1,189 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# ---------------------------------------------------------
+# Write-Behind Session Persistence
+# ---------------------------------------------------------
+# chat() used to write the session to Postgres before responding. Writes are
+# now queued here and flushed by a background thread, so request latency no
+# longer includes the round trip to the Supabase pooler. Several pending
+# writes for one session coalesce into a single flush of the latest state.
+
+
+class WriteBehindQueue:
+    """Coalescing per-session write queue drained by one background thread.
+
+    `write_fn(session_id, session_data, user_id)` performs the write and
+    raises on failure; it runs inside `app.app_context()`. Exceptions listed
+    in `fatal_errors` are not retried. Queued writes are flushed once start()
+    has been called.
+    """
+
+    def __init__(self, app, write_fn: Callable, delay: float = 0.2, max_attempts: int = 5,
+                 fatal_errors: tuple = ()):
+        self.app = app
+        self.write_fn = write_fn
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.fatal_errors = fatal_errors
+        self._cond = threading.Condition()
+        # Serialises writes so a synchronous write_now() never races a flush of older state
+        self._write_lock = threading.Lock()
+        # session_id -> {"data", "user_id", "queued_at", "attempts", "seq", "not_before"};
+        # insertion order = oldest first
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._inflight: set = set()
+        # Snapshot ordering: a flush is skipped if a newer snapshot was already written.
+        # Only kept while an older snapshot of the session is still queued or in flight.
+        self._seq = 0
+        self._written_seq: Dict[str, int] = {}
+        self._stopping = False
+        self.flushed = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.last_flush_ms = None
+        self.max_lag_ms = 0.0
+        self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+
+    def start(self):
+        """Start the background flush thread (once)."""
+        if self._thread.ident is None:
+            self._thread.start()
+
+    def enqueue(self, session_id: str, session_data: dict, user_id=None):
+        # Snapshot now - the live dict keeps changing while we wait
+        snapshot = dict(session_data)
+        snapshot["transcript"] = list(session_data.get("transcript", []))
+        with self._cond:
+            self._seq += 1
+            existing = self._pending.pop(session_id, None)
+            if existing:
+                self.coalesced += 1
+                user_id = user_id or existing["user_id"]  # only the first (create) write carries it
+            self._pending[session_id] = {
+                "data": snapshot,
+                "user_id": user_id,
+                "queued_at": existing["queued_at"] if existing else time.time(),
+                "attempts": 0,
+                "seq": self._seq,
+                # A retry backoff still applies to the newer snapshot
+                "not_before": existing["not_before"] if existing else 0.0,
+            }
+            self._cond.notify()
+
+    def write_now(self, session_id: str, session_data: dict, user_id=None, **kwargs):
+        """Write synchronously, superseding anything still queued for the session."""
+        with self._write_lock:
+            with self._cond:
+                self._seq += 1
+                seq = self._seq
+                pending = self._pending.pop(session_id, None)
+            if pending:
+                user_id = user_id or pending["user_id"]
+            with self.app.app_context():
+                self.write_fn(session_id, session_data, user_id, **kwargs)
+            with self._cond:
+                # Only an older snapshot still queued or in flight needs to know
+                if session_id in self._pending or session_id in self._inflight:
+                    self._written_seq[session_id] = seq
+
+    def has_unsaved(self, session_id: str) -> bool:
+        """True while a write for the session is queued or in progress."""
+        with self._cond:
+            return session_id in self._pending or session_id in self._inflight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            oldest = next(iter(self._pending.values()), None)
+            lag_ms = (time.time() - oldest["queued_at"]) * 1000 if oldest else 0.0
+            return {
+                "pending": len(self._pending),
+                "lag_ms": round(lag_ms, 1),
+                "max_lag_ms": round(self.max_lag_ms, 1),
+                "last_flush_ms": self.last_flush_ms,
+                "flushed": self.flushed,
+                "coalesced": self.coalesced,
+                "failed": self.failed,
+            }
+
+    def shutdown(self, timeout: float = 30):
+        """Stop the worker after writing everything still pending."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread.ident is not None:
+            self._thread.join(timeout)
+        if self._pending:
+            print(f" [WARNING] Write-behind queue stopped with {len(self._pending)} unsaved session(s)")
+
+    # --- Worker ---
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    due_in = self._next_due_in()
+                    if due_in is not None and due_in <= 0:
+                        break
+                    self._cond.wait(due_in)
+                if not self._pending and self._stopping:
+                    return
+            if not self._stopping:
+                # Give back-to-back writes for the same session a moment to coalesce
+                time.sleep(self.delay)
+            self._drain()
+
+    def _next_due_in(self):
+        """Seconds until the earliest queued write may run, or None if nothing is queued."""
+        if not self._pending:
+            return None
+        return min(item["not_before"] for item in self._pending.values()) - time.time()
+
+    def _drain(self):
+        with self._cond:
+            # Writes backing off after a failure stay queued until due (all go on shutdown)
+            now = time.time()
+            batch = {sid: item for sid, item in self._pending.items()
+                     if self._stopping or item["not_before"] <= now}
+            for session_id in batch:
+                del self._pending[session_id]
+            self._inflight = set(batch)
+
+        try:
+            with self.app.app_context():
+                for session_id, item in batch.items():
+                    self._flush(session_id, item)
+                    with self._cond:
+                        self._inflight.discard(session_id)
+                        if session_id not in self._pending:
+                            self._written_seq.pop(session_id, None)
+        finally:
+            with self._cond:
+                self._inflight = set()
+
+    def _flush(self, session_id: str, item: Dict[str, Any]):
+        start = time.time()
+        try:
+            with self._write_lock:
+                if self._written_seq.get(session_id, 0) > item["seq"]:
+                    return  # superseded by a write_now() while we waited
+                self.write_fn(session_id, item["data"], item["user_id"])
+        except Exception as e:
+            item["attempts"] += 1
+            if item["attempts"] >= self.max_attempts or self._stopping or isinstance(e, self.fatal_errors):
+                self.failed += 1
+                print(f" [ERROR] Giving up persisting session {session_id} after {item['attempts']} attempt(s): {e}")
+                return
+            print(f" [WARNING] Persisting session {session_id} failed (attempt {item['attempts']}), will retry: {e}")
+            item["not_before"] = time.time() + min(2 ** item["attempts"], 30) * 0.1
+            with self._cond:
+                # A newer snapshot queued meanwhile supersedes this one
+                if session_id not in self._pending:
+                    self._pending[session_id] = item
+            return
+
+        now = time.time()
+        self.flushed += 1
+        self.last_flush_ms = round((now - start) * 1000, 1)
+        self.max_lag_ms = max(self.max_lag_ms, (now - item["queued_at"]) * 1000)
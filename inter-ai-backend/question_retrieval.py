@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from lexical_retrieval import BM25Index, reciprocal_rank_fusion
+from startup import Lazy
+
+# ---------------------------------------------------------
+# Framework Question Retrieval
+# ---------------------------------------------------------
+# vector_data.py builds framework_faiss.index + framework_meta.json offline.
+# The index is loaded once per process (memory-mapped, so gunicorn workers
+# share the same pages) and queried with the user's message, restricted to
+# the session's active frameworks. Without an index or an embedding client
+# we fall back to BM25 over framework_questions.json.
+#
+# Modes (QUESTION_RETRIEVAL):
+#   vector  - FAISS similarity, lexical fallback (default)
+#   lexical - BM25 only, never touches the network
+#   hybrid  - FAISS and BM25 rankings fused with reciprocal rank fusion
+
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+HYBRID_CANDIDATES = 4  # each engine contributes top_k * this to the fusion
+
+
+def _import_faiss():
+    try:
+        import faiss
+    except ImportError:
+        return None
+    return faiss
+
+
+# Imported when the index is first loaded, not when this module is
+faiss_module = Lazy("faiss", _import_faiss)
+
+
+def format_question(framework: str, stage: str, question: str) -> str:
+    return f"[{framework} | {stage}] {question}"
+
+
+class QuestionRetriever:
+    """Top-k framework questions by similarity to the user's message."""
+
+    def __init__(self, questions: List[Dict], index_path: str, meta_path: str,
+                 embed_fn: Optional[Callable[[str], List[float]]] = None, mode: str = "vector"):
+        if mode not in RETRIEVAL_MODES:
+            print(f" [WARNING] Unknown retrieval mode '{mode}', using 'vector'.")
+            mode = "vector"
+        self.mode = mode
+        self.questions = questions
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.embed_fn = embed_fn
+        self.index = None
+        self.meta = None
+        self._ids_by_framework: Dict[str, np.ndarray] = {}
+        self._selectors: Dict[frozenset, object] = {}
+        self._selector_lock = threading.Lock()
+        self.lexical = BM25Index(questions)
+
+    @property
+    def vector_enabled(self) -> bool:
+        return self.index is not None and self.embed_fn is not None
+
+    def load(self) -> bool:
+        """Load the FAISS index and metadata. Returns False if vector search is unavailable."""
+        if self.mode == "lexical":
+            print(f" [INFO] Lexical question retrieval over {self.lexical.size} questions.")
+            return False
+        faiss = faiss_module.get()
+        if faiss is None:
+            print(" [WARNING] faiss not installed - using keyword question retrieval.")
+            return False
+        if not (os.path.exists(self.index_path) and os.path.exists(self.meta_path)):
+            print(f" [WARNING] FAISS index not found at {self.index_path} - using keyword question retrieval.")
+            return False
+
+        try:
+            try:
+                index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except Exception:
+                # Older faiss builds can't mmap every index type
+                index = faiss.read_index(self.index_path)
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception as e:
+            print(f" [ERROR] Failed to load FAISS index: {e}")
+            return False
+
+        if index.ntotal != len(meta.get("questions", [])):
+            print(f" [ERROR] FAISS index has {index.ntotal} vectors but metadata lists {len(meta.get('questions', []))} questions - rebuild with vector_data.py.")
+            return False
+
+        by_framework: Dict[str, List[int]] = {}
+        for row, fw in enumerate(meta.get("frameworks", [])):
+            by_framework.setdefault((fw or "").upper(), []).append(row)
+
+        self.index = index
+        self.meta = meta
+        self._ids_by_framework = {fw: np.array(rows, dtype="int64") for fw, rows in by_framework.items()}
+        print(f" [SUCCESS] Loaded FAISS index v{meta.get('version', 0)} with {index.ntotal} questions (dim {index.d}).")
+        return True
+
+    def search(self, user_text: str, active_frameworks: List[str], top_k: int = 5) -> List[str]:
+        frameworks = [fw for fw in (active_frameworks or []) if fw]
+        if self.mode != "lexical" and self.vector_enabled and user_text:
+            try:
+                if self.mode == "hybrid":
+                    limit = top_k * HYBRID_CANDIDATES
+                    return reciprocal_rank_fusion([
+                        self._vector_search(user_text, frameworks, limit),
+                        self._lexical_search(user_text, frameworks, limit),
+                    ], top_k)
+                return self._vector_search(user_text, frameworks, top_k)
+            except Exception as e:
+                print(f" [WARNING] Vector question retrieval failed, using lexical: {e}")
+        return self._lexical_search(user_text, frameworks, top_k)
+
+    # --- Vector path ---
+
+    def _selector(self, frameworks: List[str]):
+        """IDSelector restricting the search to the given frameworks (cached per set)."""
+        key = frozenset(fw.upper() for fw in frameworks)
+        with self._selector_lock:
+            if key not in self._selectors:
+                parts = [self._ids_by_framework[fw] for fw in key if fw in self._ids_by_framework]
+                ids = np.concatenate(parts) if parts else np.array([], dtype="int64")
+                # The selector only holds a pointer - keep the array alive alongside it
+                self._selectors[key] = (faiss_module.get().IDSelectorBatch(ids), ids)
+            return self._selectors[key]
+
+    def _vector_search(self, user_text: str, frameworks: List[str], top_k: int) -> List[str]:
+        start = time.perf_counter()
+        query = np.asarray([self.embed_fn(user_text)], dtype="float32")
+        embedded = time.perf_counter()
+
+        params = None
+        if frameworks:
+            selector, ids = self._selector(frameworks)
+            if not len(ids):
+                return self._lexical_search(user_text, frameworks, top_k)
+            params = faiss_module.get().SearchParameters(sel=selector)
+        _, rows = self.index.search(query, top_k, params=params)
+
+        results = [
+            format_question(self.meta["frameworks"][row], self.meta["stages"][row], self.meta["questions"][row])
+            for row in rows[0] if row >= 0
+        ]
+        print(f" [PERF] Question retrieval: embed {(embedded - start) * 1000:.0f}ms, search {(time.perf_counter() - embedded) * 1000:.2f}ms")
+        return results
+
+    # --- Lexical path ---
+
+    def _lexical_search(self, user_text: str, frameworks: List[str], top_k: int) -> List[str]:
+        return [
+            format_question(self.questions[i].get("framework", ""), self.questions[i].get("stage", ""), self.questions[i].get("question", ""))
+            for i, _ in self.lexical.search(user_text, frameworks, top_k)
+        ]
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# ---------------------------------------------------------
+# Report Render Cache
+# ---------------------------------------------------------
+# A report PDF is a pure function of its render inputs (report_data,
+# transcript, user name, ...) and the layout code. report_key() hashes
+# those inputs together with the template version; when a session's stored
+# report_hash matches, /complete re-runs, retries and double clicks reuse
+# the PDF that already exists instead of laying it out and uploading it
+# again. The hash is persisted on practice_history, so this holds across
+# restarts.
+#
+# Without blob storage, PDFs are kept here as <hash>.pdf, least recently
+# used first out once the directory passes its size budget.
+
+
+def render_transcript(transcript: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """The part of each turn the PDF draws. Other keys (audio_url, ...) come and
+    go between the in-memory and the DB-loaded session and must not change the key."""
+    return [{"role": turn.get("role", "user"), "content": turn.get("content") or ""} for turn in transcript or []]
+
+
+def report_key(job: Dict[str, Any], template_version: str) -> str:
+    """Stable sha256 of the render inputs and template version."""
+    canonical = json.dumps(
+        {"template": template_version, "job": job},
+        sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LocalReportCache:
+    """Content-addressed PDF files in one directory, bounded by total size."""
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recently used first
+        self.counters = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        # Pick up what earlier runs left, oldest first
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".pdf"):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached PDF, or None."""
+        with self._lock:
+            hit = key in self._files and os.path.exists(self.path(key))
+            if hit:
+                self._files.move_to_end(key)
+            else:
+                self._files.pop(key, None)
+            self.counters["hits" if hit else "misses"] += 1
+        if hit:
+            os.utime(self.path(key))  # keeps LRU order across restarts
+            return self.path(key)
+        return None
+
+    def put(self, key: str, pdf_bytes: bytes) -> str:
+        """Store the PDF (atomically) and return its path."""
+        path = self.path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp, path)
+        with self._lock:
+            self._files[key] = len(pdf_bytes)
+            self._files.move_to_end(key)
+            self.counters["stored"] += 1
+            self._evict(keep=key)
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "files": len(self._files),
+                "bytes": sum(self._files.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict(self, keep: str):
+        total = sum(self._files.values())
+        while total > self.max_bytes and len(self._files) > 1:
+            key, size = next(iter(self._files.items()))
+            if key == keep:
+                break
+            del self._files[key]
+            total -= size
+            self.counters["evicted"] += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
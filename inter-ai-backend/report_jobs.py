@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import datetime as dt
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# ---------------------------------------------------------
+# Background Report Jobs
+# ---------------------------------------------------------
+# /complete used to run analysis, PDF rendering, blob upload and DB writes
+# inside the HTTP request. Those now run here as a job with per-stage
+# progress. Jobs live in a local SQLite file so queued or interrupted work
+# is picked up again after a restart.
+
+REPORT_STAGES = ["analysis", "render", "upload", "persist"]
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return dt.datetime.fromtimestamp(ts).isoformat() if ts else None
+
+
+class ReportJobQueue:
+    """Durable job queue with bounded worker concurrency.
+
+    `handler(session_id, progress)` does the actual work. It reports stage
+    changes by calling `progress(stage)` (or `progress(stage, "skipped")`) and
+    returns a JSON-serialisable result.
+    """
+
+    def __init__(self, db_path: str, handler: Callable, max_workers: int = 2, stale_after: int = 300,
+                 max_attempts: int = 3):
+        self.db_path = db_path
+        self.handler = handler
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._enqueue_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS report_jobs (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    stages TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_report_jobs_session ON report_jobs(session_id, status)")
+
+    def _connect(self):
+        # Autocommit: every statement is its own transaction
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Public API ---
+
+    def enqueue(self, session_id: str) -> Dict[str, Any]:
+        """Queue a report job, reusing the session's in-flight job if there is one."""
+        with self._enqueue_lock:
+            existing = self.active_job_for(session_id)
+            if existing:
+                return existing
+
+            now = time.time()
+            job_id = str(uuid.uuid4())
+            stages = {stage: {"status": "pending"} for stage in REPORT_STAGES}
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT INTO report_jobs (id, session_id, status, stages, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (job_id, session_id, json.dumps(stages), now, now)
+                )
+
+        self._executor.submit(self._run, job_id)
+        print(f" [INFO] Queued report job {job_id} for session {session_id}")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def active_job_for(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM report_jobs WHERE session_id = ? AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+                (session_id, *ACTIVE_STATUSES)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recover(self) -> int:
+        """Re-submit queued jobs and running jobs whose worker went away.
+
+        A job that has already been started max_attempts times (say, one that
+        keeps taking its process down) is marked failed instead.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE report_jobs SET status = 'queued' WHERE status = 'running' AND updated_at < ?",
+                (now - self.stale_after,)
+            )
+            given_up = conn.execute(
+                "UPDATE report_jobs SET status = 'failed', error = ?, updated_at = ? WHERE status = 'queued' AND attempts >= ?",
+                (f"Interrupted {self.max_attempts} times; not retrying", now, self.max_attempts)
+            ).rowcount
+            rows = conn.execute("SELECT id FROM report_jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+
+        if given_up:
+            print(f" [WARNING] Gave up on {given_up} report job(s) after {self.max_attempts} attempts")
+        for row in rows:
+            self._executor.submit(self._run, row["id"])
+        if rows:
+            print(f" [INFO] Recovered {len(rows)} pending report job(s)")
+        return len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM report_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    # --- Worker ---
+
+    def _run(self, job_id: str):
+        # Claim atomically so two processes sharing the file never run the same job
+        with closing(self._connect()) as conn:
+            claimed = conn.execute(
+                "UPDATE report_jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+            row = conn.execute("SELECT session_id FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        if not claimed or not row:
+            return
+
+        try:
+            result = self.handler(row["session_id"], lambda stage, status="running": self._set_stage(job_id, stage, status))
+            self._finish(job_id, "completed", result=result)
+            print(f" [SUCCESS] Report job {job_id} completed")
+        except Exception as e:
+            print(f" [ERROR] Report job {job_id} failed: {e}")
+            import traceback
+            traceback.print_exc()
+            self._finish(job_id, "failed", error=str(e))
+
+    def _set_stage(self, job_id: str, stage: str, status: str = "running"):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT stage, stages FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"])
+            # Entering a new stage completes the previous one
+            previous = row["stage"]
+            if previous and previous != stage and stages[previous]["status"] == "running":
+                stages[previous].update(status="done", finished_at=now)
+            entry = stages.setdefault(stage, {})
+            entry["status"] = status
+            if status == "running":
+                entry["started_at"] = now
+            else:
+                entry["finished_at"] = now
+            conn.execute(
+                "UPDATE report_jobs SET stage = ?, stages = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(stages), now, job_id)
+            )
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: str = None):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT stage, stages FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"])
+            current = row["stage"]
+            if current and stages[current]["status"] == "running":
+                stages[current].update(status="done" if status == "completed" else "failed", finished_at=now)
+            conn.execute(
+                "UPDATE report_jobs SET status = ?, stages = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(stages), json.dumps(result) if result is not None else None, error, now, job_id)
+            )
+
+    def _to_dict(self, row) -> Dict[str, Any]:
+        stages = json.loads(row["stages"])
+        for entry in stages.values():
+            for key in ("started_at", "finished_at"):
+                if key in entry:
+                    entry[key] = _iso(entry[key])
+        return {
+            "job_id": row["id"],
+            "session_id": row["session_id"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "stages": stages,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": _iso(row["created_at"]),
+            "updated_at": _iso(row["updated_at"]),
+        }
@@ -0,0 +1,128 @@
+import copy
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict
+
+# ---------------------------------------------------------
+# Report Rendering Process Pool
+# ---------------------------------------------------------
+# PDF layout (FPDF, text sanitising, the radar chart) is CPU-bound Python.
+# Run in a request or job thread it holds the GIL and stalls every other
+# request in the process, so reports are rendered in worker processes that
+# take plain dicts and return PDF bytes.
+#
+# Workers are forked, not spawned: spawn/forkserver children re-run the
+# main script (app.py) with all of its start-up side effects. app.py's
+# startup hook therefore calls start() - forking the workers - before it
+# starts any threads. Each worker imports cli_report (fpdf) and loads the
+# report fonts once.
+
+
+def _warm_worker():
+    import cli_report
+    cli_report.report_fonts.get()  # parse the report font metrics before the first job
+
+
+def _ping():
+    return True
+
+
+def _render(job: Dict[str, Any]) -> bytes:
+    from cli_report import render_report_bytes
+    return render_report_bytes(**job)
+
+
+class ReportRenderer:
+    """Renders report PDFs in a pre-warmed process pool.
+
+    Until start(), with pool_size=0, or where fork isn't available
+    (Windows), reports are rendered in the calling thread as before.
+    """
+
+    def __init__(self, pool_size: int = 2, timeout: float = 120):
+        self.timeout = timeout
+        self.pool_size = pool_size if "fork" in multiprocessing.get_all_start_methods() else 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self.counters = {"rendered": 0, "failed": 0, "timeouts": 0, "restarts": 0}
+        self.last_render_ms = None
+
+    def start(self):
+        """Fork the worker pool (once)."""
+        with self._lock:
+            if self.pool_size and self._executor is None:
+                self._executor = self._start_pool()
+
+    def render(self, **job) -> bytes:
+        """PDF bytes for render_report_bytes(**job); raises TimeoutError past the per-job timeout."""
+        start = time.time()
+        executor = self._executor
+        try:
+            if executor is None:
+                # Layout code mutates its input; give it a copy, as a worker process would get
+                pdf_bytes = _render(copy.deepcopy(job))
+            else:
+                pdf_bytes = executor.submit(_render, job).result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count("timeouts")
+            self._restart(executor, f"render exceeded {self.timeout}s")
+            raise TimeoutError(f"Report render exceeded {self.timeout}s")
+        except BrokenProcessPool:
+            self._count("failed")
+            self._restart(executor, "a worker died")
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+
+        self.last_render_ms = round((time.time() - start) * 1000, 1)
+        self._count("rendered")
+        return pdf_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "pool_size": self.pool_size,
+            "in_process": self._executor is None,
+            "timeout": self.timeout,
+            "last_render_ms": self.last_render_ms,
+        }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ---
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_warm_worker
+        )
+        # The first submit forks every worker; they import cli_report straight away
+        executor.submit(_ping)
+        return executor
+
+    def _restart(self, failed: ProcessPoolExecutor, reason: str):
+        """Replace the pool, killing its workers (a hung render can't be cancelled)."""
+        with self._lock:
+            if failed is None or self._executor is not failed:
+                return  # already replaced by another caller
+            print(f" [WARNING] Restarting report render pool: {reason}")
+            # These workers fork from a threaded process. They only run cli_report
+            # code; one that deadlocks on an inherited lock times out like a hung render
+            self._executor = self._start_pool()
+            self.counters["restarts"] += 1
+        for process in list((getattr(failed, "_processes", None) or {}).values()):
+            process.terminate()
+        failed.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
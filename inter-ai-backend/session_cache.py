@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# ---------------------------------------------------------
+# Bounded In-Memory Session Cache
+# ---------------------------------------------------------
+# Replaces the unbounded SESSIONS dict. Entries are evicted least recently
+# used first once max_entries or max_bytes is exceeded, and dropped after
+# ttl seconds without access. Sizes are estimated from the JSON encoding
+# when an entry is stored; sessions mutated in place are re-measured the
+# next time they are stored with set().
+
+
+def _estimate_bytes(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return 0
+
+
+class SessionCache:
+    """Thread-safe LRU + idle-TTL cache of session dicts."""
+
+    def __init__(self, max_entries: int = 500, max_bytes: int = 256 * 1024 * 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        # key -> (value, size in bytes, last access time), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # --- Mapping-style API ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            value, size, _ = entry
+            self._entries[key] = (value, size, time.monotonic())
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        size = _estimate_bytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            self._evict()
+
+    __setitem__ = set
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._live_entry(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def values(self) -> List[Any]:
+        """Snapshot of live values (does not count as access)."""
+        with self._lock:
+            self._expire()
+            return [value for value, _, _ in self._entries.values()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # --- Internals (call with the lock held) ---
+
+    def _live_entry(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl and time.monotonic() - entry[2] > self.ttl:
+            self._entries.pop(key)
+            self._bytes -= entry[1]
+            self.expirations += 1
+            return None
+        return entry
+
+    def _expire(self):
+        if not self.ttl:
+            return
+        cutoff = time.monotonic() - self.ttl
+        # Oldest access first, so stop at the first live entry
+        while self._entries:
+            key, (_, size, last_access) = next(iter(self._entries.items()))
+            if last_access > cutoff:
+                break
+            self._entries.popitem(last=False)
+            self._bytes -= size
+            self.expirations += 1
+
+    def _evict(self):
+        self._expire()
+        # Always keep the most recent entry, even if it alone exceeds max_bytes
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
@@ -0,0 +1,84 @@
+import threading
+from typing import Any, Dict
+
+# ---------------------------------------------------------
+# Per-Session Locks
+# ---------------------------------------------------------
+# chat() mutates the cached session dict (transcript, framework counts).
+# Two requests for the same session - a double submit, or two tabs - used to
+# interleave their turns. A chat turn now holds its session's lock from
+# loading the session until the reply is recorded; a second request waits
+# briefly and is then rejected. Locks exist only while someone holds or
+# waits for them, so the table stays as small as the number of live turns.
+
+
+class SessionBusy(Exception):
+    """The session's lock could not be taken within the timeout."""
+
+
+class SessionLease:
+    """A held session lock. release() is safe to call more than once."""
+
+    def __init__(self, table: "SessionLocks", session_id: str, lock: threading.Lock):
+        self._table = table
+        self._lock = lock
+        self.session_id = session_id
+        self._released = False
+
+    def release(self):
+        with self._table._guard:
+            if self._released:
+                return
+            self._released = True
+        self._lock.release()
+        self._table._unref(self.session_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SessionLocks:
+    """Lock table keyed by session_id with wait/busy counters."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._entries: Dict[str, list] = {}  # session_id -> [lock, holders + waiters]
+        self.counters = {"acquired": 0, "waited": 0, "busy": 0}
+
+    def acquire(self, session_id: str, timeout: float = 0.0) -> SessionLease:
+        """Take the session's lock, waiting up to `timeout` seconds; raises SessionBusy."""
+        with self._guard:
+            entry = self._entries.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        lock = entry[0]
+
+        acquired = lock.acquire(blocking=False)
+        if not acquired and timeout > 0:
+            self._count("waited")
+            acquired = lock.acquire(timeout=timeout)
+        if not acquired:
+            self._unref(session_id)
+            self._count("busy")
+            raise SessionBusy(session_id)
+
+        self._count("acquired")
+        return SessionLease(self, session_id, lock)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._guard:
+            return {**self.counters, "active": len(self._entries)}
+
+    def _unref(self, session_id: str):
+        with self._guard:
+            entry = self._entries.get(session_id)
+            if entry:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._entries[session_id]
+
+    def _count(self, name: str):
+        with self._guard:
+            self.counters[name] += 1
@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# ---------------------------------------------------------
+# Shared Session State Store
+# ---------------------------------------------------------
+# Without this, every get_session() reads Postgres so that all workers see
+# the same state. With SESSION_STORE_URL set, active sessions live in a
+# store every worker can reach cheaply:
+#   redis://host:6379/0        - Redis (or anything speaking its protocol)
+#   sqlite:////path/state.db   - embedded SQLite file (WAL + mmap) for a
+#                                single host, or for local runs and tests
+# Postgres becomes a checkpoint, written by the write-behind queue at
+# intervals and on completion. Each stored session carries a revision
+# (`state_rev`); put() rejects a write based on an older revision, so two
+# workers can't interleave turns of one session.
+
+REV_KEY = "state_rev"
+
+
+class SessionConflict(Exception):
+    """The stored session moved past the revision the caller read."""
+
+
+class SessionStore:
+    """Interface for session state backends. Values are JSON-serialisable dicts."""
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session dict (with its `state_rev`), or None."""
+        raise NotImplementedError
+
+    def put(self, session_id: str, data: Dict[str, Any], check: bool = True) -> int:
+        """Store the session and return its new revision (also set on `data`).
+
+        With check=True the write only applies if the stored revision still
+        matches data's `state_rev`; otherwise SessionConflict is raised.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _encode(data: Dict[str, Any]) -> str:
+        return json.dumps({k: v for k, v in data.items() if k != REV_KEY}, default=str)
+
+
+class RedisSessionStore(SessionStore):
+    """One hash per session ({data, rev}); revision checks run as a Lua script."""
+
+    # KEYS[1] = key; ARGV = data, expected rev ('' = don't check), ttl seconds
+    PUT_SCRIPT = """
+local rev = tonumber(redis.call('HGET', KEYS[1], 'rev') or '0')
+if ARGV[2] ~= '' and tonumber(ARGV[2]) ~= rev then
+    return -1
+end
+rev = rev + 1
+redis.call('HSET', KEYS[1], 'data', ARGV[1], 'rev', rev)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return rev
+"""
+
+    def __init__(self, url: str, ttl: float = 86400, prefix: str = "coact:session:"):
+        try:
+            import redis  # only needed when SESSION_STORE_URL points at Redis
+        except ImportError:
+            raise RuntimeError("redis is not installed - pip install redis")
+        self.client = redis.Redis.from_url(url, socket_timeout=2)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._put = self.client.register_script(self.PUT_SCRIPT)
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "conflicts": 0}
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw, rev = self.client.hmget(self.prefix + session_id, "data", "rev")
+        if raw is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        data = json.loads(raw)
+        data[REV_KEY] = int(rev)
+        return data
+
+    def put(self, session_id: str, data: Dict[str, Any], check: bool = True) -> int:
+        expected = data.get(REV_KEY, 0) if check else ""
+        rev = self._put(keys=[self.prefix + session_id], args=[self._encode(data), expected, self.ttl])
+        if rev < 0:
+            self.counters["conflicts"] += 1
+            raise SessionConflict(f"Session {session_id} changed since revision {expected}")
+        self.counters["writes"] += 1
+        data[REV_KEY] = int(rev)
+        return data[REV_KEY]
+
+    def delete(self, session_id: str):
+        self.client.delete(self.prefix + session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "ttl": self.ttl, **self.counters}
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session state in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path: str, ttl: float = 86400, mmap_mb: int = 256):
+        self.path = path
+        self.ttl = ttl
+        self.mmap_bytes = mmap_mb * 1024 * 1024
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "conflicts": 0, "expired": 0}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_state (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                rev INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit so each statement is its own transaction
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT data, rev FROM session_state WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+        self._count("hits" if row else "misses")
+        if not row:
+            return None
+        data = json.loads(row[0])
+        data[REV_KEY] = row[1]
+        return data
+
+    def put(self, session_id: str, data: Dict[str, Any], check: bool = True) -> int:
+        sql = """
+            INSERT INTO session_state (session_id, data, rev, expires_at) VALUES (?, ?, 1, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                data = excluded.data,
+                rev = session_state.rev + 1,
+                expires_at = excluded.expires_at
+        """
+        params = [session_id, self._encode(data), time.time() + self.ttl]
+        if check:
+            # An expired row counts as gone, whatever its revision
+            sql += " WHERE session_state.rev = ? OR session_state.expires_at <= ?"
+            params += [data.get(REV_KEY, 0), time.time()]
+        row = self._conn().execute(sql + " RETURNING rev", params).fetchone()
+        if row is None:
+            self._count("conflicts")
+            raise SessionConflict(f"Session {session_id} changed since revision {data.get(REV_KEY, 0)}")
+        self._count("writes")
+        data[REV_KEY] = row[0]
+        self._maybe_purge()
+        return row[0]
+
+    def delete(self, session_id: str):
+        self._conn().execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"backend": "sqlite", "path": self.path, "ttl": self.ttl, **counters}
+
+    def _maybe_purge(self):
+        with self._lock:
+            self._puts += 1
+            if self._puts % 500:
+                return
+        cur = self._conn().execute("DELETE FROM session_state WHERE expires_at <= ?", (time.time(),))
+        self._count("expired", cur.rowcount)
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+
+def create_session_store(url: str, ttl: float = 86400) -> Optional[SessionStore]:
+    """Backend for SESSION_STORE_URL, or None when it is unset."""
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url, ttl=ttl)
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):], ttl=ttl)
+    raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
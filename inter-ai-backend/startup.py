@@ -0,0 +1,129 @@
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# ---------------------------------------------------------
+# Lazy Initialisation & Startup Profiling
+# ---------------------------------------------------------
+# Importing app.py used to import every SDK and build every remote client
+# (LLM, Supabase, Azure Blob, the question index) before serving a request.
+# Those now sit behind Lazy accessors: built on first use, or ahead of time
+# by warmup(). `python app.py --profile-startup` reports how long each
+# import and initialisation took, then exits.
+
+
+class StartupProfile:
+    """Timings of imports (main thread only) and named init steps, in order."""
+
+    def __init__(self):
+        self.entries: List[tuple] = []  # (kind, name, depth, ms)
+        self.enabled = False
+        self._depth = 0
+        self._original_import = None
+        self._main_thread = threading.main_thread()
+
+    def start(self):
+        """Time every first import of a top-level package from here on."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self):
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def record(self, kind: str, name: str, ms: float, depth: int = 0):
+        if self.enabled:
+            self.entries.append((kind, name, depth, ms))
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record("init", name, (time.perf_counter() - start) * 1000)
+
+    def report(self, min_ms: float = 5.0) -> str:
+        total = (time.perf_counter() - self.started_at) * 1000 if self.enabled else 0.0
+        lines = [" [PERF] Startup profile (imports nest; entries under %.0f ms hidden)" % min_ms]
+        for kind, name, depth, ms in self.entries:
+            if ms >= min_ms:
+                lines.append(f"   {kind:<7}{'  ' * depth}{name:<{40 - 2 * depth}} {ms:9.1f} ms")
+        lines.append(f"   {'total':<47} {total:9.1f} ms")
+        return "\n".join(lines)
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        top = name.partition(".")[0]
+        if level or top in sys.modules or threading.current_thread() is not self._main_thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = self._depth
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.record("import", top, (time.perf_counter() - start) * 1000, depth)
+
+
+startup_profile = StartupProfile()
+
+_registry: List["Lazy"] = []
+
+
+class Lazy:
+    """A value built by `factory()` on first get(), exactly once, thread-safely.
+
+    A factory that raises is retried on the next get().
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._ready = False
+        self._value = None
+        _registry.append(self)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> Any:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self._ready = True
+                startup_profile.record("init", self.name, (time.perf_counter() - start) * 1000)
+        return self._value
+
+
+def warmup(names: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+    """Build every registered Lazy (or just `names`) now. Returns ms per name, None on failure."""
+    timings = {}
+    for lazy in list(_registry):
+        if names and lazy.name not in names:
+            continue
+        start = time.perf_counter()
+        try:
+            lazy.get()
+            timings[lazy.name] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            print(f" [WARNING] Warmup of {lazy.name} failed: {e}")
+            timings[lazy.name] = None
+    return timings
+
+
+def lazy_status() -> Dict[str, bool]:
+    return {lazy.name: lazy.ready for lazy in _registry}
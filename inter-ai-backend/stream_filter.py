@@ -0,0 +1,88 @@
+import json
+
+# ---------------------------------------------------------
+# Incremental filtering of streamed roleplay replies
+# ---------------------------------------------------------
+# The roleplay prompts ask the model for [THOUGHT]...[/THOUGHT] blocks and
+# <<FRAMEWORK: X>> / <<RELEVANCE: Y>> tags. Those must never reach the user,
+# so streamed chunks are passed through TagStripper before being sent.
+
+HIDDEN_BLOCKS = [
+    ("[THOUGHT]", "[/THOUGHT]"),
+    ("<<", ">>"),
+]
+
+
+def _partial_opener_length(text: str) -> int:
+    """Length of the longest suffix of text that could begin a hidden block."""
+    longest = 0
+    for opener, _ in HIDDEN_BLOCKS:
+        for size in range(1, len(opener)):
+            if size > longest and text.endswith(opener[:size]):
+                longest = size
+    return longest
+
+
+class TagStripper:
+    """Removes hidden blocks from a stream of text chunks as they arrive.
+
+    Text that might be the start of a hidden block is held back until the
+    next chunk proves otherwise, so a tag split across chunks never leaks.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._closer = None  # closing marker we are waiting for, if inside a block
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the text that is now safe to show."""
+        self._buffer += chunk
+        visible = []
+
+        while self._buffer:
+            if self._closer:
+                end = self._buffer.find(self._closer)
+                if end == -1:
+                    # Keep only what could be the beginning of the closer
+                    keep = len(self._closer) - 1
+                    self._buffer = self._buffer[-keep:]
+                    break
+                self._buffer = self._buffer[end + len(self._closer):]
+                self._closer = None
+                continue
+
+            hits = [(self._buffer.find(opener), opener, closer) for opener, closer in HIDDEN_BLOCKS]
+            hits = [hit for hit in hits if hit[0] != -1]
+            if hits:
+                start, opener, closer = min(hits)
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(opener):]
+                self._closer = closer
+                continue
+
+            hold = _partial_opener_length(self._buffer)
+            visible.append(self._buffer[:len(self._buffer) - hold])
+            self._buffer = self._buffer[len(self._buffer) - hold:]
+            break
+
+        return self._emit("".join(visible))
+
+    def flush(self) -> str:
+        """Return any held-back text once the stream has ended."""
+        tail = "" if self._closer else self._buffer
+        self._buffer = ""
+        self._closer = None
+        return self._emit(tail)
+
+    def _emit(self, text: str) -> str:
+        # Drop leading whitespace so the reply doesn't start with a blank line
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+def sse_event(event: str, data) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
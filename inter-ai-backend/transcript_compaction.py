@@ -0,0 +1,155 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from startup import Lazy
+
+# ---------------------------------------------------------
+# Bounded-Context Transcript Compaction
+# ---------------------------------------------------------
+# The roleplay prompt used to embed the whole history as indented JSON, so
+# prompt size grew with every turn. Here the history becomes:
+#   1. a compact line-oriented encoding ("USER: ..." / "AI: ...")
+#   2. turns older than HISTORY_WINDOW_MESSAGES abridged to one line each:
+#      the per-turn digest summary when incremental analysis produced one,
+#      otherwise plain truncation to the first few words
+#   3. a hard token budget per mode, measured with a local tokenizer
+#
+# Older lines are built newest-first and only until the budget is spent, so
+# the work per turn stays bounded however long the session runs.
+
+HISTORY_WINDOW_MESSAGES = int(os.getenv("HISTORY_WINDOW_MESSAGES", "8"))
+
+# Token budget for the history block, by prompt mode
+DEFAULT_HISTORY_BUDGETS = {
+    "evaluation": 1200,
+    "coaching": 1000,
+    "mentorship": 1500,
+}
+
+ABRIDGED_WORDS_PER_TURN = 25
+
+
+def _load_encoding():
+    """The tiktoken encoding, or None. get_encoding may download the BPE file on first use."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    for name in ("o200k_base", "cl100k_base"):  # gpt-4o / gpt-4.1 family first
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:
+            print(f" [WARNING] Could not load tokenizer {name}: {e}")
+    return None
+
+
+token_encoding = Lazy("tokenizer", _load_encoding)
+
+
+def count_tokens(text: str) -> int:
+    """Token count from the local tokenizer (~4 chars/token if tiktoken is unavailable)."""
+    if not text:
+        return 0
+    encoding = token_encoding.get()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def _load_budgets() -> Dict[str, int]:
+    """Budgets can be overridden with HISTORY_TOKEN_BUDGETS="evaluation=1500,coaching=800"."""
+    budgets = dict(DEFAULT_HISTORY_BUDGETS)
+    for pair in os.getenv("HISTORY_TOKEN_BUDGETS", "").split(","):
+        if "=" in pair:
+            mode, value = pair.split("=", 1)
+            try:
+                budgets[mode.strip()] = int(value)
+            except ValueError:
+                print(f" [WARNING] Ignoring invalid history budget: {pair}")
+    return budgets
+
+
+HISTORY_TOKEN_BUDGETS = _load_budgets()
+
+
+def _clean(content: str) -> str:
+    # Hidden tags are instructions to us, not conversation - don't replay them
+    content = re.sub(r"\[THOUGHT\].*?\[/THOUGHT\]", "", content or "", flags=re.DOTALL)
+    content = re.sub(r"<<.*?>>", "", content, flags=re.DOTALL)
+    return " ".join(content.split())
+
+
+def _speaker(role: str) -> str:
+    return "USER" if role == "user" else "AI"
+
+
+def encode_turns(turns: List[Dict[str, str]]) -> List[str]:
+    """One line per message: 'USER: ...' / 'AI: ...'."""
+    return [f"{_speaker(t.get('role'))}: {_clean(t.get('content'))}" for t in turns]
+
+
+def abridge_turn(turn: Dict[str, str], summary: Optional[str] = None, user_turn: int = None) -> str:
+    """One short line for an older message: its digest summary, else its opening words."""
+    if summary:
+        return f"- USER (turn {user_turn}): {summary}"
+    words = _clean(turn.get("content")).split()
+    text = " ".join(words[:ABRIDGED_WORDS_PER_TURN]) + (" ..." if len(words) > ABRIDGED_WORDS_PER_TURN else "")
+    return f"- {_speaker(turn.get('role'))}: {text}"
+
+
+def _truncate_line(line: str, max_tokens: int) -> str:
+    if count_tokens(line) <= max_tokens:
+        return line
+    # Shrink by characters until it fits; ~4 chars/token is a good first guess
+    cut = max_tokens * 4
+    while cut > 0 and count_tokens(line[:cut] + " ...") > max_tokens:
+        cut = int(cut * 0.8)
+    return line[:cut] + " ..."
+
+
+def compact_history(turns: List[Dict[str, str]], mode: str = "coaching", turn_summaries: Optional[Dict[int, str]] = None,
+                    window: int = None, budget: int = None) -> str:
+    """Render conversation history within a fixed token budget.
+
+    Recent messages are kept verbatim; older ones are abridged to one line
+    each. Recent messages take the budget first (oldest dropped first, the
+    latest always kept); abridged lines fill what is left, newest first.
+    """
+    window = HISTORY_WINDOW_MESSAGES if window is None else window
+    budget = budget or HISTORY_TOKEN_BUDGETS.get(mode, DEFAULT_HISTORY_BUDGETS["coaching"])
+    turn_summaries = turn_summaries or {}
+
+    older, recent = (turns[:-window], turns[-window:]) if window and len(turns) > window else ([], turns)
+    recent_lines = [_truncate_line(line, budget // 2) for line in encode_turns(recent)]
+    recent_cost = [count_tokens(line) + 1 for line in recent_lines]
+    omitted = 0
+    while sum(recent_cost) > budget and len(recent_lines) > 1:
+        recent_lines.pop(0)
+        recent_cost.pop(0)
+        omitted += 1
+
+    remaining = budget - sum(recent_cost)
+    older_lines = []
+    user_turn = sum(1 for t in older if t.get("role") == "user")
+    for index in range(len(older) - 1, -1, -1):
+        turn = older[index]
+        is_user = turn.get("role") == "user"
+        line = abridge_turn(turn, turn_summaries.get(user_turn) if is_user else None, user_turn)
+        user_turn -= is_user
+        cost = count_tokens(line) + 1
+        if cost > remaining:
+            omitted += index + 1
+            break
+        older_lines.append(line)
+        remaining -= cost
+    older_lines.reverse()
+
+    sections = []
+    if older_lines or omitted:
+        header = "EARLIER IN THE CONVERSATION (abridged)"
+        if omitted:
+            header += f" - {omitted} older message(s) omitted"
+        sections.append(header + ":\n" + "\n".join(older_lines))
+    sections.append("\n".join(recent_lines))
+    return "\n\n".join(s for s in sections if s.strip())
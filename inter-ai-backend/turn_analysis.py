@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+# ---------------------------------------------------------
+# Incremental Per-Turn Analysis
+# ---------------------------------------------------------
+# Each user turn is analysed in the background while the roleplay reply is
+# being generated. By the time the session completes, the report only needs
+# a small synthesis call over these per-turn digests.
+#
+# Digests are session state: they live on the session dict under
+# "turn_digests" ({"<user turn number>": digest}) and are persisted and
+# shared with it (practice_history.turn_digests, the session store). A turn
+# whose digest never arrived - a restart, another worker - is analysed when
+# the report is collected, as long as most turns already have one.
+
+BACKFILL_MAX_SHARE = 0.5  # more missing than this and the full-transcript analysis is cheaper
+
+
+def session_digests(sess: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return sess.get("turn_digests") or {}
+
+
+def record_digest(sess: Dict[str, Any], turn_number: int, digest: Dict[str, Any]):
+    # Replace rather than mutate: queued DB snapshots may share the old dict
+    sess["turn_digests"] = {**session_digests(sess), str(turn_number): digest}
+
+
+def digest_summaries(sess: Dict[str, Any]) -> Dict[int, str]:
+    """One-line summaries of the turns analysed so far."""
+    return {int(turn): d["summary"] for turn, d in session_digests(sess).items() if d.get("summary")}
+
+
+class TurnAnalyzer:
+    """Runs per-turn analysis on a worker pool and records digests on the session."""
+
+    def __init__(self, analyze_fn: Callable[..., Optional[Dict[str, Any]]],
+                 lookup: Callable[[str], Optional[Dict[str, Any]]], max_workers: int = 4):
+        self.analyze_fn = analyze_fn
+        # Current dict for a session id; the session may have been reloaded since submit()
+        self.lookup = lookup
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn-analysis")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[int, Any]] = {}
+
+    def submit(self, session_id: str, sess: Dict[str, Any], turn_number: int, **turn_context):
+        """Queue analysis of one user turn. Re-submitting a turn replaces its digest."""
+        future = self._executor.submit(self._analyze, session_id, sess, turn_number, turn_context)
+        with self._lock:
+            self._pending.setdefault(session_id, {})[turn_number] = future
+        # Outside the lock: a future that already finished runs the callback right here
+        future.add_done_callback(lambda f: self._forget(session_id, turn_number, f))
+        return future
+
+    def collect(self, session_id: str, sess: Dict[str, Any], expected_turns: int,
+                context_fn: Callable[[int], Optional[Dict[str, Any]]], timeout: float = 30) -> Optional[List[Dict[str, Any]]]:
+        """Wait for in-flight turns, analyse any that are missing, and return digests in order.
+
+        Returns None unless every user turn 1..expected_turns has a digest, so
+        callers can fall back to full-transcript analysis.
+        """
+        if expected_turns <= 0:
+            return None
+        with self._lock:
+            futures = list(self._pending.get(session_id, {}).values())
+        if futures:
+            wait(futures, timeout=timeout)
+
+        # Digests recorded on a newer copy of the session count too
+        current = self.lookup(session_id)
+        if current is not None and current is not sess:
+            sess["turn_digests"] = {**session_digests(sess), **session_digests(current)}
+
+        missing = [turn for turn in range(1, expected_turns + 1) if str(turn) not in session_digests(sess)]
+        if missing and len(missing) <= expected_turns * BACKFILL_MAX_SHARE:
+            print(f" [INFO] Analysing {len(missing)} turn(s) of {session_id} without a digest")
+            backfill = [self.submit(session_id, sess, turn, **context) for turn in missing
+                        for context in [context_fn(turn)] if context]
+            wait(backfill, timeout=timeout)
+
+        digests = session_digests(sess)
+        if any(str(turn) not in digests for turn in range(1, expected_turns + 1)):
+            print(f" [INFO] Turn digests incomplete for {session_id} ({len(digests)}/{expected_turns})")
+            return None
+        return [digests[str(turn)] for turn in range(1, expected_turns + 1)]
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._pending.pop(session_id, None)
+
+    def _forget(self, session_id: str, turn_number: int, future):
+        """Drop a finished (or failed) future, unless a re-submit has replaced it."""
+        if not future.cancelled() and future.exception():
+            print(f" [WARNING] Turn analysis failed for {session_id} turn {turn_number}: {future.exception()}")
+        with self._lock:
+            pending = self._pending.get(session_id)
+            if pending and pending.get(turn_number) is future:
+                del pending[turn_number]
+                if not pending:
+                    del self._pending[session_id]
+
+    def _analyze(self, session_id: str, sess: Dict[str, Any], turn_number: int, turn_context: Dict[str, Any]):
+        digest = self.analyze_fn(turn_number=turn_number, **turn_context)
+        if not digest:
+            return None
+        record_digest(sess, turn_number, digest)
+        current = self.lookup(session_id)
+        if current is not None and current is not sess:
+            record_digest(current, turn_number, digest)
+        return digest
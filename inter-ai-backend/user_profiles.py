@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# ---------------------------------------------------------
+# User Profile Cache
+# ---------------------------------------------------------
+# Reports are personalised with the user's display name, which used to cost
+# a Supabase admin API call on every completion. Names are now remembered
+# from verified token claims (/api/auth/sync, /api/session/start) and only
+# looked up through the admin API when a user isn't cached. Failed or empty
+# lookups are cached too, for a shorter time.
+
+DEFAULT_DISPLAY_NAME = "Valued User"
+
+
+def resolve_display_name(user_metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    meta = user_metadata or {}
+    return meta.get("full_name") or meta.get("name") or meta.get("email")
+
+
+class UserProfileCache:
+    """user_id -> display name, with TTL, negative caching and hit-rate counters."""
+
+    def __init__(self, lookup_fn: Callable[[str], Optional[Dict[str, Any]]], ttl: float = 3600,
+                 negative_ttl: float = 300, max_entries: int = 10000):
+        self.lookup_fn = lookup_fn  # user_id -> user_metadata dict, or None if not found
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # user_id -> (name or None, expires_at)
+        self.counters = {"hits": 0, "negative_hits": 0, "misses": 0, "filled_from_claims": 0, "lookup_errors": 0}
+
+    def remember(self, user) -> Optional[str]:
+        """Cache the name from an authenticated user (token claims)."""
+        if not user or not getattr(user, "id", None):
+            return None
+        name = resolve_display_name(getattr(user, "user_metadata", None))
+        if name:
+            self._store(str(user.id), name, self.ttl)
+            with self._lock:
+                self.counters["filled_from_claims"] += 1
+        return name
+
+    def display_name(self, user_id: str, default: str = DEFAULT_DISPLAY_NAME) -> str:
+        if not user_id:
+            return default
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > time.time():
+                self._entries.move_to_end(user_id)
+                self.counters["hits" if entry[0] else "negative_hits"] += 1
+                return entry[0] or default
+            self.counters["misses"] += 1
+
+        try:
+            name = resolve_display_name(self.lookup_fn(user_id))
+        except Exception as e:
+            print(f" [WARNING] Failed to fetch user name: {e}")
+            with self._lock:
+                self.counters["lookup_errors"] += 1
+            name = None
+
+        self._store(user_id, name, self.ttl if name else self.negative_ttl)
+        return name or default
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["negative_hits"] + counters["misses"]
+        return {
+            **counters,
+            "entries": size,
+            "hit_rate": round((counters["hits"] + counters["negative_hits"]) / lookups, 3) if lookups else None,
+        }
+
+    def _store(self, user_id: str, name: Optional[str], ttl: float):
+        with self._lock:
+            self._entries[user_id] = (name, time.time() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
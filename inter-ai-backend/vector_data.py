@@ -1,98 +1,206 @@
+import argparse
+import datetime as dt
+import hashlib
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import faiss
 import numpy as np
 from openai import AzureOpenAI
-import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # -------------------
-# 1. Setup
+# Framework Question Index Builder
 # -------------------
-endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-api_key = os.getenv("AZURE_OPENAI_API_KEY")
-api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview")
-
-if not endpoint or not api_key:
-    raise ValueError("Please set AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY environment variables.")
+# Builds framework_faiss.index + framework_meta.json from framework_questions.json.
+#   - questions are embedded in batches, several batches in flight at once
+#   - every finished batch is appended to a checkpoint, so an interrupted
+#     build resumes where it stopped
+#   - embeddings are cached by content hash (model + id + text); a rebuild
+#     only embeds questions that are new or changed
+#   - the index is only written when every question has an embedding
 
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version=api_version,
-    azure_endpoint=endpoint
-)
-
-# Use absolute paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE = os.path.join(BASE_DIR, "framework_questions.json")
-INDEX_FILE = os.path.join(BASE_DIR, "framework_faiss.index")
-META_FILE = os.path.join(BASE_DIR, "framework_meta.json")
+INDEX_FILE = os.getenv("FAISS_INDEX_FILE", os.path.join(BASE_DIR, "framework_faiss.index"))
+META_FILE = os.getenv("FAISS_META_FILE", os.path.join(BASE_DIR, "framework_meta.json"))
+CACHE_FILE = os.path.join(BASE_DIR, "framework_embeddings.npz")
+CHECKPOINT_FILE = os.path.join(BASE_DIR, "framework_embeddings.partial.jsonl")
+
+EMBEDDING_MODEL = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
+MAX_ATTEMPTS = 4
+
+
+def content_hash(item: dict, model: str = EMBEDDING_MODEL) -> str:
+    key = f"{model}\x1f{item.get('id', '')}\x1f{item['question'].strip()}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+# -------------------
+# Embedding cache + checkpoint
+# -------------------
+def load_cache() -> dict:
+    """hash -> embedding from the last full build plus any interrupted one."""
+    cache = {}
+    if os.path.exists(CACHE_FILE):
+        with np.load(CACHE_FILE) as data:
+            cache.update(zip(data["hashes"].tolist(), data["vectors"]))
+    if os.path.exists(CHECKPOINT_FILE):
+        resumed = 0
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line from a crash
+                cache[entry["hash"]] = np.asarray(entry["embedding"], dtype="float32")
+                resumed += 1
+        print(f"Resuming: {resumed} embeddings recovered from checkpoint.")
+    return cache
+
+
+def save_cache(hashes: list, vectors: np.ndarray):
+    tmp = CACHE_FILE + ".tmp.npz"
+    np.savez(tmp, hashes=np.array(hashes), vectors=vectors)
+    os.replace(tmp, CACHE_FILE)
+
 
 # -------------------
-# 2. Load Questions
+# Embedding
 # -------------------
-print(f"Loading questions from {DATA_FILE}...")
-with open(DATA_FILE, "r", encoding="utf-8") as f:
-    data = json.load(f)
+def embed_batches(client, pending: list, batch_size: int, concurrency: int) -> dict:
+    """Embed (hash, text) pairs in batches; every finished batch is checkpointed."""
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    results = {}
+    failed = []
+    write_lock = threading.Lock()
+
+    def run(batch):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                res = client.embeddings.create(model=EMBEDDING_MODEL, input=[text for _, text in batch])
+                # Results carry their input index; don't rely on response order
+                return {batch[d.index][0]: d.embedding for d in res.data}
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                delay = 2 ** attempt
+                print(f"  Batch failed ({e}), retrying in {delay}s...")
+                time.sleep(delay)
+
+    with open(CHECKPOINT_FILE, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(run, batch): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), 1):
+            batch = futures[future]
+            try:
+                embedded = future.result()
+            except Exception as e:
+                print(f"  Error embedding batch of {len(batch)}: {e}")
+                failed.extend(batch)
+                continue
+            with write_lock:
+                for h, emb in embedded.items():
+                    checkpoint.write(json.dumps({"hash": h, "embedding": emb}) + "\n")
+                checkpoint.flush()
+            results.update(embedded)
+            print(f"  Embedded batch {done}/{len(batches)}")
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} question(s) could not be embedded - rerun to resume from the checkpoint.")
+    return results
 
-print(f"Found {len(data)} questions.")
 
 # -------------------
-# 3. Generate embeddings and build FAISS index
+# Build
 # -------------------
-print("Generating embeddings (this may take a while)...")
-
-dim = 1536  # embedding dimension for text-embedding-ada-002
-index = faiss.IndexFlatL2(dim)
-
-# Store metadata separately
-questions = []
-stages = []
-frameworks = []
-
-embeddings = []
-
-for i, item in enumerate(data):
-    q = item["question"]
-    
-    # Progress indicator
-    if (i + 1) % 50 == 0:
-        print(f"  Processed {i + 1}/{len(data)} questions...")
-    
-    # Get embedding
-    try:
-        emb = client.embeddings.create(
-            model=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002"),
-            input=q
-        ).data[0].embedding
-        
-        embeddings.append(emb)
-        questions.append(q)
-        stages.append(item.get("stage", ""))
-        frameworks.append(item.get("framework", ""))
-    except Exception as e:
-        print(f"  Error on question {i}: {e}")
-        continue
-
-print(f"\nSuccessfully embedded {len(embeddings)} questions.")
-
-emb_matrix = np.array(embeddings).astype("float32")
-print(f"Embedding matrix shape: {emb_matrix.shape}")
-print(f"FAISS index dimension: {dim}")
-
-if emb_matrix.shape[1] != dim:
-    raise ValueError(f"Embedding dimension mismatch: got {emb_matrix.shape[1]}, expected {dim}")
-
-index.add(emb_matrix)
-
-# Save index + metadata
-faiss.write_index(index, INDEX_FILE)
-
-meta = {"questions": questions, "stages": stages, "frameworks": frameworks}
-with open(META_FILE, "w", encoding="utf-8") as f:
-    json.dump(meta, f)
-
-print(f"\n✅ FAISS index built with {len(questions)} questions")
-print(f"   Index saved to: {INDEX_FILE}")
-print(f"   Metadata saved to: {META_FILE}")
+def build(batch_size: int = 64, concurrency: int = 4, full: bool = False):
+    print(f"Loading questions from {DATA_FILE}...")
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        data = [item for item in json.load(f) if item.get("question", "").strip()]
+    print(f"Found {len(data)} questions.")
+
+    hashes = [content_hash(item) for item in data]
+    if full and os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    cache = {} if full else load_cache()
+
+    pending, seen = [], set()
+    for h, item in zip(hashes, data):
+        if h not in cache and h not in seen:
+            pending.append((h, item["question"].strip()))
+            seen.add(h)
+    print(f"{len(data) - len(pending)} cached, {len(pending)} to embed.")
+
+    if pending:
+        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        api_key = os.getenv("AZURE_OPENAI_API_KEY")
+        if not endpoint or not api_key:
+            raise ValueError("Please set AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY environment variables.")
+        client = AzureOpenAI(
+            api_key=api_key,
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
+            azure_endpoint=endpoint
+        )
+        start = time.time()
+        for h, emb in embed_batches(client, pending, batch_size, concurrency).items():
+            cache[h] = np.asarray(emb, dtype="float32")
+        print(f"Embedded {len(pending)} questions in {time.time() - start:.1f}s.")
+
+    emb_matrix = np.vstack([cache[h] for h in hashes]).astype("float32")
+    dim = emb_matrix.shape[1]
+    index = faiss.IndexFlatL2(dim)
+    index.add(emb_matrix)
+
+    # Version bumps only when the indexed content actually changes
+    source_hash = hashlib.sha256("".join(hashes).encode("utf-8")).hexdigest()
+    previous = {}
+    if os.path.exists(META_FILE):
+        with open(META_FILE, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    version = previous.get("version", 0)
+    if previous.get("source_hash") != source_hash:
+        version += 1
+
+    meta = {
+        "version": version,
+        "source_hash": source_hash,
+        "model": EMBEDDING_MODEL,
+        "dim": dim,
+        "built_at": dt.datetime.utcnow().isoformat() + "Z",
+        "ids": [item.get("id", "") for item in data],
+        "hashes": hashes,
+        "questions": [item["question"] for item in data],
+        "stages": [item.get("stage", "") for item in data],
+        "frameworks": [item.get("framework", "") for item in data],
+    }
+
+    # Write next to the targets and swap in, so a running app never reads a half-written index
+    faiss.write_index(index, INDEX_FILE + ".tmp")
+    with open(META_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
+    os.replace(META_FILE + ".tmp", META_FILE)
+
+    # Keep only embeddings still in use; the checkpoint is folded into the cache
+    save_cache(hashes, emb_matrix)
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+
+    print(f"\n✅ FAISS index v{version} built with {len(data)} questions (dim {dim})")
+    print(f"   Index saved to: {INDEX_FILE}")
+    print(f"   Metadata saved to: {META_FILE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the framework question FAISS index.")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+    parser.add_argument("--full", action="store_true", help="Ignore cached embeddings and re-embed everything")
+    args = parser.parse_args()
+    build(batch_size=args.batch_size, concurrency=args.concurrency, full=args.full)
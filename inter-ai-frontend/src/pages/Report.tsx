@@ -124,6 +124,8 @@ export default function Report() {
     const [showTranscript, setShowTranscript] = useState(false)
 
     useEffect(() => {
+        let cancelled = false
+
         const fetchReport = async () => {
             try {
                 if (!sessionId) return
@@ -136,17 +138,29 @@ export default function Report() {
                     headers['Authorization'] = `Bearer ${session.access_token}`;
                 }
 
-                const response = await fetch(getApiUrl(`/api/session/${sessionId}/report_data`), { headers })
+                const reportUrl = getApiUrl(`/api/session/${sessionId}/report_data`)
+                let response = await fetch(reportUrl, { headers })
+                // 202: the report job started by /complete is still running - poll until it finishes
+                while (response.status === 202 && !cancelled) {
+                    const retryAfter = Number(response.headers.get("Retry-After")) || 2
+                    await new Promise(resolve => setTimeout(resolve, retryAfter * 1000))
+                    response = await fetch(reportUrl, { headers })
+                }
+                if (cancelled) return
                 if (!response.ok) throw new Error("Failed to fetch report data")
                 const data: GenericReportData = await response.json()
                 setData(data)
                 setLoading(false)
             } catch (err) {
                 console.error("Error generating report:", err)
-                setLoading(false)
+                if (!cancelled) setLoading(false)
             }
         }
         fetchReport()
+
+        return () => {
+            cancelled = true
+        }
     }, [sessionId])
 
     const handleDownload = async () => {
@@ -18,6 +18,11 @@ CREATE TABLE public.practice_history (
     transcript JSONB DEFAULT '[]'::jsonb,
     report_data JSONB DEFAULT '{}'::jsonb,
     completed BOOLEAN DEFAULT FALSE,
+    version INTEGER NOT NULL DEFAULT 0, -- bumped on every backend write (optimistic concurrency)
+    report_hash TEXT, -- render inputs + template version of the last report PDF
+    report_template TEXT,
+    report_blob TEXT, -- Azure Blob with the report PDF; links are signed on demand
+    turn_digests JSONB, -- per-user-turn analysis the report is synthesized from
     score INTEGER,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
@@ -47,7 +52,7 @@ CREATE TABLE public.coaching_reports (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
-CREATE INDEX idx_coaching_reports_session_id ON public.coaching_reports(session_id);
+CREATE UNIQUE INDEX idx_coaching_reports_session_id ON public.coaching_reports(session_id);
 CREATE INDEX idx_coaching_reports_user_id ON public.coaching_reports(user_id);
 
 ALTER TABLE public.coaching_reports ENABLE ROW LEVEL SECURITY;
@@ -71,7 +76,7 @@ CREATE TABLE public.sales_reports (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
-CREATE INDEX idx_sales_reports_session_id ON public.sales_reports(session_id);
+CREATE UNIQUE INDEX idx_sales_reports_session_id ON public.sales_reports(session_id);
 CREATE INDEX idx_sales_reports_user_id ON public.sales_reports(user_id);
 
 ALTER TABLE public.sales_reports ENABLE ROW LEVEL SECURITY;
@@ -121,7 +126,7 @@ CREATE TABLE public.learning_plans (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
-CREATE INDEX idx_learning_plans_session_id ON public.learning_plans(session_id);
+CREATE UNIQUE INDEX idx_learning_plans_session_id ON public.learning_plans(session_id);
 CREATE INDEX idx_learning_plans_user_id ON public.learning_plans(user_id);
 
 ALTER TABLE public.learning_plans ENABLE ROW LEVEL SECURITY;
@@ -168,6 +173,26 @@ CREATE TRIGGER on_auth_user_created
     FOR EACH ROW EXECUTE FUNCTION public.handle_new_user();
 
 
+-- ============================================================
+-- 8. PRACTICE TURNS TABLE (append-only transcript messages)
+-- ============================================================
+CREATE TABLE public.practice_turns (
+    session_id TEXT NOT NULL REFERENCES public.practice_history(session_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (session_id, seq)
+);
+
+ALTER TABLE public.practice_turns ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own turns" ON public.practice_turns FOR SELECT USING (
+    EXISTS (SELECT 1 FROM public.practice_history ph WHERE ph.session_id = practice_turns.session_id AND ph.user_id = (select auth.uid()))
+);
+
+
 -- ============================================================
 -- DONE! All tables created with RLS enabled.
 -- ============================================================